@@ -35,56 +35,181 @@ QID, and so on. You'll need a second function to do this, at the end, I would li
 
 import requests
 import json, os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-WIKIDATA_API_ENDPOINT = "https://www.wikidata.org/w/api.php"
+from class_hierarchy import CATEGORY_PROPERTIES, ClassHierarchy
+from entity_store import EntityStore
+from label_cache import LabelCache
+from pipeline_metrics import PipelineMetrics, SampledProfiler
+from wikidata_client import TokenBucket, WikidataClient
 
-def fetch_complete_entity_data(qid):
+# Can be pointed at a local stand-in (see mock_wikidata_server.py) through the environment
+WIKIDATA_API_ENDPOINT = os.environ.get("WIKIDATA_API_ENDPOINT", "https://www.wikidata.org/w/api.php")
+
+# Wikidata API limit for 'ids' parameter is typically 50
+MAX_IDS_PER_REQUEST = 50
+
+# wbgetentities error codes caused by a single bad id, which reject the whole batch
+PER_ID_ERROR_CODES = {'no-such-entity', 'param-illegal'}
+
+# Request all relevant data: claims (properties), labels, descriptions, sitelinks (Wikipedia links),
+# plus 'info' for the revision id used by incremental refreshes
+DEFAULT_ENTITY_PROPS = 'info|claims|labels|descriptions|sitelinks|aliases'
+
+# Projections are passed to the entity fetchers as keyword arguments:
+#   props: the wbgetentities 'props' to request
+#   languages: languages of labels/descriptions/aliases to request (None = all)
+#   properties: property IDs whose claims are kept after decoding (None = all)
+FULL_PROJECTION = {'props': DEFAULT_ENTITY_PROPS, 'languages': None, 'properties': None}
+
+# Only what the analysis uses: the English label and description read into the
+# records, plus instance of, sex or gender, occupation, date of birth and country
+LEAN_PROJECTION = {
+    'props': 'info|claims|labels|descriptions',
+    'languages': ['en'],
+    'properties': ['P31', 'P21', 'P106', 'P569', 'P17'],
+}
+
+
+# Shared pooled client for every call to the Wikidata API (keep-alive, retries, maxlag)
+_client = WikidataClient()
+
+def set_request_rate_limit(requests_per_second):
+    """
+    Sets (or clears, with None) the global requests-per-second limit shared by all threads.
+    """
+    _client.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+
+def _api_get(params, timeout=10):
+    """
+    Sends one API request through the shared client and returns the decoded JSON.
+    """
+    return _client.get(WIKIDATA_API_ENDPOINT, params, timeout=timeout)
+
+# Shared label cache consulted by fetch_labels_for_qids (None means always ask the API)
+_label_cache = None
+
+def set_label_cache(cache):
+    """
+    Installs (or removes, with None) the LabelCache used by fetch_labels_for_qids.
+    """
+    global _label_cache
+    _label_cache = cache
+
+def _entity_params(ids, props, languages):
+    """
+    Builds the wbgetentities parameters for the given ids and projection.
+    """
+    params = {
+        'action': 'wbgetentities',
+        'ids': '|'.join(ids),
+        'format': 'json',
+        'props': props,
+    }
+    if languages:
+        params['languages'] = '|'.join(languages)
+    return params
+
+def _project_claims(entity_data, properties):
+    """
+    Drops, in place, the claims of properties that are not in the whitelist.
+    """
+    if properties is not None and 'claims' in entity_data:
+        wanted = set(properties)
+        entity_data['claims'] = {pid: statements for pid, statements in entity_data['claims'].items()
+                                 if pid in wanted}
+    return entity_data
+
+# Metrics registry for the current run (None means no instrumentation)
+_metrics = None
+
+def set_metrics(metrics):
+    """
+    Installs (or removes, with None) the PipelineMetrics that the pipeline stages report to.
+    """
+    global _metrics
+    _metrics = metrics
+    _client.metrics = metrics
+
+def _stage(name):
+    """
+    Returns a context manager timing one pipeline stage (a no-op without metrics).
+    """
+    return _metrics.stage(name) if _metrics is not None else nullcontext()
+
+# Subclass-of index used to add rolled-up category columns to records (None = no columns)
+_class_hierarchy = None
+
+def set_class_hierarchy(hierarchy):
+    """
+    Installs (or removes, with None) the ClassHierarchy used by process_single_qid.
+    """
+    global _class_hierarchy
+    _class_hierarchy = hierarchy
+
+def category_source_qids(claims: dict) -> dict:
+    """
+    Returns the value QIDs of the properties the category columns are rolled up from
+    (class_hierarchy.CATEGORY_PROPERTIES, i.e. instance of and occupation), by property.
+    """
+    values = {}
+    for pid in CATEGORY_PROPERTIES:
+        values[pid] = []
+        for statement in claims.get(pid, []):
+            data_value = statement.get('mainsnak', {}).get('datavalue', {})
+            if data_value.get('type') == 'wikibase-entityid':
+                values[pid].append(data_value['value']['id'])
+    return values
+
+def _entity_result(qid, entities, properties):
+    """
+    Picks qid's entity out of the 'entities' of a wbgetentities response, following
+    redirects, and returns its projected data or an error dictionary when it is
+    missing. Single and batched requests share this, so a QID gets the same result
+    whatever else was requested with it.
+    """
+    entity_data = entities.get(qid)
+    if entity_data is None:
+        # Redirected ids can come back under the id they redirect to
+        entity_data = next((e for e in entities.values()
+                            if e.get('redirects', {}).get('from') == qid), None)
+
+    if entity_data is None:
+        return {"error": f"Entity {qid} not found or no data returned."}
+    if 'missing' in entity_data:
+        return {"error": f"Entity {qid} is missing (deleted or never existed)."}
+    return _project_claims(entity_data, properties)
+
+def fetch_complete_entity_data(qid, props=DEFAULT_ENTITY_PROPS, languages=None, properties=None):
     """
     Fetches all available structured data for a single Wikidata entity (QID)
     using the official Wikibase API action=wbgetentities.
 
     Args:
         qid (str): The Wikidata Item ID (e.g., 'Q83285' for Durres).
+        props (str): The wbgetentities 'props' to request.
+        languages (list[str]): Only request labels/descriptions/aliases in these languages (None = all).
+        properties (list[str]): Only keep the claims of these property IDs (None = all).
 
     Returns:
         dict: The complete raw JSON data for the entity, or an error dictionary.
     """
 
     # Parameters for the MediaWiki API, using the 'wbgetentities' action
-    params = {
-        'action': 'wbgetentities',
-        'ids': qid,
-        'format': 'json',
-        # Request all relevant data: claims (properties), labels, descriptions, sitelinks (Wikipedia links)
-        'props': 'claims|labels|descriptions|sitelinks|aliases',
-    }
-
-    # Add a User-Agent header as recommended by Wikidata API policies
-    # https://www.wikidata.org/wiki/Wikidata:Contact_the_development_team#User-Agent
-    headers = {
-        'User-Agent': 'Colab-Wikidata-Example/1.0 (https://colab.research.google.com; colab-user@example.com)'
-    }
+    params = _entity_params([qid], props, languages)
 
+    # The shared client sends the User-Agent header recommended by Wikidata API policies
+    # and retries throttled, failing or lagged requests before giving up
     try:
-        response = requests.get(WIKIDATA_API_ENDPOINT, 
-                                params=params, 
-                                headers=headers, 
-                                timeout=10)
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-
-        data = response.json()
+        data = _api_get(params, timeout=10)
 
         # Check for potential errors in the API response structure
         if 'error' in data:
             return {"error": f"API Error for {qid}: {data['error']['info']}"}
 
         # The core data is nested under ['entities'][qid]
-        entity_data = data.get('entities', {}).get(qid)
-
-        if entity_data:
-            return entity_data
-        else:
-            return {"error": f"Entity {qid} not found or no data returned."}
+        return _entity_result(qid, data.get('entities', {}), properties)
 
     except requests.exceptions.RequestException as e:
         return {"error": f"Network or API request error: {e}"}
@@ -98,10 +223,61 @@ def _chunk_list(lst, n):
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
 
+def fetch_complete_entities_batch(qids: list[str], props=DEFAULT_ENTITY_PROPS, languages=None, properties=None):
+    """
+    Fetches the complete structured data (claims, labels, descriptions, sitelinks, aliases)
+    for many entities, using up to MAX_IDS_PER_REQUEST ids per wbgetentities call.
+
+    Args:
+        qids (list[str]): A list of Wikidata Item IDs (e.g., ['Q83285', 'Q7186']).
+        props (str): The wbgetentities 'props' to request.
+        languages (list[str]): Only request labels/descriptions/aliases in these languages (None = all).
+        properties (list[str]): Only keep the claims of these property IDs (None = all).
+
+    Returns:
+        dict: Maps every requested QID to its raw entity data, or to an error dictionary
+              when the entity is missing or its request failed.
+    """
+    results = {}
+
+    for qid_chunk in _chunk_list(list(qids), MAX_IDS_PER_REQUEST):
+        params = _entity_params(qid_chunk, props, languages)
+
+        try:
+            data = _api_get(params, timeout=30)
+        except requests.exceptions.RequestException as e:
+            for qid in qid_chunk:
+                results[qid] = {"error": f"Network or API request error: {e}"}
+            continue
+        except json.JSONDecodeError:
+            for qid in qid_chunk:
+                results[qid] = {"error": "Failed to decode JSON response."}
+            continue
+
+        if 'error' in data:
+            # One malformed or deleted id makes the API reject the whole chunk, so for
+            # those codes fall back to single requests to find out which id is at fault.
+            # Server-side errors (maxlag, ratelimited, ...) are returned for every id:
+            # re-requesting each id would multiply the load on a struggling server.
+            if len(qid_chunk) > 1 and data['error'].get('code') in PER_ID_ERROR_CODES:
+                for qid in qid_chunk:
+                    results[qid] = fetch_complete_entity_data(qid, props, languages, properties)
+            else:
+                for qid in qid_chunk:
+                    results[qid] = {"error": f"API Error for {qid}: {data['error'].get('info', data['error'].get('code'))}"}
+            continue
+
+        entities = data.get('entities', {})
+        for qid in qid_chunk:
+            results[qid] = _entity_result(qid, entities, properties)
+
+    return results
+
 def fetch_labels_for_qids(qids: list[str], lang='en'):
     """
     Fetches labels for a list of Wikidata QIDs or Property IDs.
-    Handles API limits by chunking the requests.
+    Handles API limits by chunking the requests. When a label cache is installed
+    with set_label_cache, only the ids missing from the cache are requested.
 
     Args:
         qids (list[str]): A list of Wikidata Item IDs or Property IDs (e.g., ['Q515', 'P31']).
@@ -113,10 +289,12 @@ def fetch_labels_for_qids(qids: list[str], lang='en'):
     if not qids:
         return {}
 
-    # Wikidata API limit for 'ids' parameter is typically 50
-    MAX_IDS_PER_REQUEST = 50
     all_labels_map = {}
 
+    if _label_cache is not None:
+        cached, qids = _label_cache.get_many(list(dict.fromkeys(qids)), lang)
+        all_labels_map.update({qid: label for qid, label in cached.items() if label})
+
     # Chunk the QID list to respect the API limit
     for qid_chunk in _chunk_list(qids, MAX_IDS_PER_REQUEST):
         params = {
@@ -127,24 +305,26 @@ def fetch_labels_for_qids(qids: list[str], lang='en'):
             'languages': lang,
         }
 
-        headers = {
-            'User-Agent': 'Colab-Wikidata-Example/1.0 (https://colab.research.google.com; colab-user@example.com)'
-        }
-
         try:
-            response = requests.get(WIKIDATA_API_ENDPOINT, params=params, headers=headers, timeout=10)
-            response.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx)
-
-            data = response.json()
+            data = _api_get(params, timeout=10)
 
             if 'error' in data:
                 # If an error occurs in one chunk, return it immediately or log and continue
                 return {"error": f"API Error fetching labels for chunk {qid_chunk}: {data['error']['info']}"}
 
+            fetched_labels = {}
             for qid_key, entity_info in data.get('entities', {}).items():
                 label = entity_info.get('labels', {}).get(lang, {}).get('value')
-                if label:
-                    all_labels_map[qid_key] = label
+                # A redirected id comes back under its target; keep the label under the
+                # requested id too, or that id would miss the cache on every run
+                requested_ids = {qid_key, entity_info.get('redirects', {}).get('from', qid_key)}
+                for requested_id in requested_ids:
+                    fetched_labels[requested_id] = label
+                    if label:
+                        all_labels_map[requested_id] = label
+
+            if _label_cache is not None:
+                _label_cache.put_many(fetched_labels, lang)
 
         except requests.exceptions.RequestException as e:
             return {"error": f"Network or API request error for chunk {qid_chunk}: {e}"}
@@ -153,7 +333,35 @@ def fetch_labels_for_qids(qids: list[str], lang='en'):
 
     return all_labels_map
 
-def extract_labeled_claim_values(claims: dict, property_labels: dict) -> dict:
+def collect_value_qids(claims: dict) -> set:
+    """
+    Returns the QIDs whose labels extract_labeled_claim_values needs for these claims:
+    entity values and quantity units of the first statement of every property.
+
+    Args:
+        claims (dict): The 'claims' section of a Wikidata entity's data.
+
+    Returns:
+        set: QIDs referenced by the claim values.
+    """
+    qids = set()
+    for statements in claims.values():
+        if not statements:
+            continue
+        main_snak = statements[0].get('mainsnak')
+        if not main_snak or 'datavalue' not in main_snak:
+            continue
+
+        data_value = main_snak['datavalue']
+        if data_value.get('type') == 'wikibase-entityid':
+            qids.add(data_value['value']['id'])
+        elif data_value.get('type') == 'quantity':
+            unit = data_value['value'].get('unit', '').replace('http://www.wikidata.org/entity/', '')
+            if unit.startswith('Q'):
+                qids.add(unit)
+    return qids
+
+def extract_labeled_claim_values(claims: dict, property_labels: dict, value_labels: dict = None) -> dict:
     """
     Extracts the main value for each claim, resolves QID values to labels,
     and returns a dictionary of 'property_label': 'value' pairs.
@@ -161,6 +369,8 @@ def extract_labeled_claim_values(claims: dict, property_labels: dict) -> dict:
     Args:
         claims (dict): The 'claims' section of a Wikidata entity's data.
         property_labels (dict): A dictionary mapping Property IDs (P-numbers) to their labels.
+        value_labels (dict): Labels for the value QIDs, already resolved elsewhere
+                             (e.g. from a dump). When None they are fetched from the API.
 
     Returns:
         dict: A dictionary where keys are property labels and values are their extracted/resolved values.
@@ -217,7 +427,11 @@ def extract_labeled_claim_values(claims: dict, property_labels: dict) -> dict:
 
     # Second pass: Resolve QID values and units to labels
     if qids_to_resolve:
-        resolved_value_labels = fetch_labels_for_qids(list(qids_to_resolve))
+        if value_labels is not None:
+            resolved_value_labels = value_labels
+        else:
+            with _stage('value_label_fetch'):
+                resolved_value_labels = fetch_labels_for_qids(list(qids_to_resolve))
         if "error" in resolved_value_labels:
             print(f"Warning: Could not resolve some value labels: {resolved_value_labels['error']}")
             # Proceed with raw QIDs if resolution fails
@@ -317,79 +531,541 @@ def test_one(QID):
     print("This raw data contains every single piece of structured information available for the entity.")
 
 
-def process_qids_to_jsonl(qid_list, output_filename="entity_data.jsonl"):
+def process_single_qid(qid, entity_data=None, labels=None):
+    """
+    Fetches, labels and structures the data for one QID.
+
+    Args:
+        qid (str): The Wikidata Item ID to process.
+        entity_data (dict): Raw entity data (or error dictionary) already fetched
+                            for this QID, e.g. by fetch_complete_entities_batch.
+                            When None the entity is fetched on its own.
+        labels (dict): Labels for the entity's property and value IDs, already
+                       resolved elsewhere. When None they are fetched from the API.
+
+    Returns:
+        dict: The JSONL record for the QID (status 'success' or 'failed').
+    """
+    # Initialize the base record structure
+    record = {"QID": qid, "status": "failed", "error_message": None}
+
+    try:
+        # 1. Fetch raw entity data (using your existing function)
+        if entity_data is None:
+            entity_data = fetch_complete_entity_data(qid)
+
+        if "error" in entity_data:
+            # Handle API/Not Found error directly
+            record["error_message"] = entity_data['error']
+        else:
+            # 2. Extract basic details
+            entity_label = entity_data.get('labels', {}).get('en', {}).get('value', 'No label found')
+            entity_description = entity_data.get('descriptions', {}).get('en', {}).get('value', 'No description found')
+            claims = entity_data.get('claims', {})
+
+            # 3. Get labels for the properties themselves (using your existing function)
+            property_ids = list(claims.keys())
+            if labels is not None:
+                property_labels = {pid: labels.get(pid, pid) for pid in property_ids}
+            else:
+                with _stage('property_label_fetch'):
+                    property_labels = fetch_labels_for_qids(property_ids)
+
+            if "error" in property_labels:
+                # Fallback for label fetching error
+                property_labels = {pid: pid for pid in property_ids}
+                print(f"  Warning: Failed to fetch property labels for {qid}. Using IDs.")
+
+            # 4. Extract and label all claim values (using your existing function)
+            with _stage('extraction'):
+                labeled_claim_values = extract_labeled_claim_values(claims, property_labels, labels)
+
+            # 5. Structure the final dictionary for successful outcome
+            record.update({
+                "status": "success",
+                "label": entity_label,
+                "description": entity_description,
+                "attributes": labeled_claim_values
+            })
+            record.pop("error_message") # Remove error key on success
+
+            # Category columns such as is_sporting_event, from the subclass-of closure of P31/P106
+            if _class_hierarchy is not None:
+                with _stage('category_rollup'):
+                    record.update(_class_hierarchy.rollup(category_source_qids(claims)))
+
+            # Revision info lets refresh_qids_to_jsonl skip unchanged entities next time
+            for key in ("lastrevid", "modified"):
+                if key in entity_data:
+                    record[key] = entity_data[key]
+
+    except Exception as e:
+        # Catch any unexpected execution errors
+        record["error_message"] = f"Unexpected execution error: {type(e).__name__} - {e}"
+
+    return record
+
+
+def read_completed_qids(output_filename):
+    """
+    Reads an existing JSONL output file and returns the QIDs that were processed successfully.
+    A trailing line cut off by a crash is removed from the file so it can be appended to safely.
+
+    Args:
+        output_filename (str): The JSONL file written by process_qids_to_jsonl.
+
+    Returns:
+        set: The QIDs whose latest record has status 'success'.
+    """
+    completed = set()
+    if not os.path.exists(output_filename):
+        return completed
+
+    with open(output_filename, 'r+b') as f:
+        good_bytes = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break # Partially written last line
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            good_bytes += len(line)
+            if record.get("status") == "success":
+                completed.add(record["QID"])
+            else:
+                completed.discard(record.get("QID"))
+        f.truncate(good_bytes)
+
+    return completed
+
+def process_qids_to_jsonl(qid_list, output_filename="entity_data.jsonl", workers=1, max_requests_per_second=None,
+                          label_cache_path="label_cache.sqlite", resume=False, checkpoint_every=500,
+                          store_path=None, projection=None, metrics_prefix=None, metrics_every_seconds=60,
+                          profile_every=0, rate_limiter=None, class_hierarchy_path=None, statements_path=None,
+                          statements_format='parquet'):
     """
     Processes a list of QIDs, fetches structured data, labels it, and stores
     the results (or errors) into a JSONL file.
+
+    Entities are fetched in batches of MAX_IDS_PER_REQUEST with
+    fetch_complete_entities_batch. With workers > 1 the batches are processed
+    concurrently by a thread pool. All threads share one token bucket, so the
+    total request rate never goes above max_requests_per_second. Records are
+    still written by a single thread and in the same order as qid_list.
+
+    Property and value labels are kept in a persistent LabelCache, so labels
+    already resolved by this or an earlier run are not requested again.
+
+    Duplicate QIDs in qid_list are only processed once. With resume=True the
+    QIDs already stored successfully in output_filename are skipped and the
+    remaining ones are appended, so a re-run after a crash only fetches the
+    failed or new entities. The file is flushed and fsynced every
+    checkpoint_every records so that at most that much work can be lost.
+
+    With store_path set, every record is also written to an indexed
+    EntityStore (see entity_store.py) for random access by QID.
+
+    With metrics_prefix set, stage timings, request counts and bytes, retries
+    and errors are written to '<metrics_prefix>.json' and '<metrics_prefix>.prom'
+    every metrics_every_seconds and at the end (see pipeline_metrics.py). With
+    profile_every > 0, one entity out of every profile_every is run under
+    cProfile and the combined stats are saved to '<metrics_prefix>.pstats'.
+
+    With class_hierarchy_path set, each successful record also gets the boolean
+    category columns of class_hierarchy.CATEGORY_ROOTS (is_sport, is_sports_team,
+    is_sporting_event, is_athlete, ...), computed from the persistent subclass-of
+    closure of its instance of (P31) and occupation (P106) values.
+
+    With statements_path set, every statement of every entity (all values, ranks
+    and qualifiers) is also written in the long columnar layout of
+    statement_table.py, as part-files in the statements_path directory. A part
+    is closed at every checkpoint, before the JSONL file is fsynced, so every
+    QID the JSONL file marks as completed has its statements in a complete part.
+    A resumed run adds parts for the entities it fetches, after dropping the
+    statements of QIDs the JSONL file does not mark as completed (written just
+    before a crash); a fresh run first deletes the parts of earlier runs, like
+    the JSONL file.
     
     Args:
         qid_list (list): A list of QID strings (e.g., ['Q534', 'Q142', 'Q999']).
         output_filename (str): The name of the JSONL file to write results to.
+        workers (int): Number of concurrent worker threads (1 = sequential).
+        max_requests_per_second (float): Global API request limit (None = no limit).
+        label_cache_path (str): SQLite file for the label cache (None disables caching).
+        resume (bool): Append to an existing output file, skipping completed QIDs.
+        checkpoint_every (int): Number of records between fsync checkpoints (at least 1).
+        store_path (str): SQLite EntityStore file to also write records to (None = JSONL only).
+        projection (dict): Entity projection (e.g. LEAN_PROJECTION) passed to the
+                           entity fetcher (None = FULL_PROJECTION).
+        metrics_prefix (str): Path prefix for the metrics files (None disables instrumentation).
+        metrics_every_seconds (float): Time between periodic metrics writes.
+        profile_every (int): Profile one entity out of this many (0 disables profiling).
+        rate_limiter: A limiter with an acquire() method to use instead of a new
+                      TokenBucket, e.g. a SharedTokenBucket shared with other processes.
+        class_hierarchy_path (str): SQLite file for the subclass-of index (None = no category columns).
+        statements_path (str): Directory for the statement part-files (None = JSONL records only).
+        statements_format (str): 'parquet' or 'arrow' (Arrow IPC) statement part-files.
     """
+    if checkpoint_every < 1:
+        raise ValueError("checkpoint_every must be at least 1")
+
+    unique_qids = list(dict.fromkeys(qid_list)) # Remove duplicates, keep first-seen order
+    completed = read_completed_qids(output_filename) if resume else set()
+    qid_list = [qid for qid in unique_qids if qid not in completed]
+
+    if resume:
+        print(f"Resuming: {len(completed)} QIDs already completed in '{output_filename}'.")
     print(f"Starting processing for {len(qid_list)} QIDs.")
     print(f"Results will be written to '{output_filename}'.")
     
     successful_count = 0
     failed_count = 0
 
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        for qid in qid_list:
-            print(f"Processing {qid}...")
-            
-            # Initialize the base record structure
-            record = {"QID": qid, "status": "failed", "error_message": None}
-            
+    if rate_limiter is not None:
+        _client.rate_limiter = rate_limiter
+    else:
+        set_request_rate_limit(max_requests_per_second)
+    label_cache = LabelCache(label_cache_path) if label_cache_path else None
+    set_label_cache(label_cache)
+    store = EntityStore(store_path) if store_path else None
+    metrics = PipelineMetrics(metrics_prefix, metrics_every_seconds) if metrics_prefix else None
+    set_metrics(metrics)
+    profiler = SampledProfiler(profile_every, (metrics_prefix or "pipeline") + ".pstats") if profile_every else None
+    hierarchy = ClassHierarchy(fetch_complete_entities_batch, class_hierarchy_path) if class_hierarchy_path else None
+    set_class_hierarchy(hierarchy)
+    statements = None
+    if statements_path:
+        from statement_table import PartWriter, clear_parts, retain_qids, statement_rows # Needs pyarrow
+        if resume:
+            retain_qids(statements_path, completed)
+        else:
+            clear_parts(statements_path)
+        statements = PartWriter(statements_path, statements_format)
+
+    def _process(qid_batch):
+        print(f"Processing {qid_batch[0]}..{qid_batch[-1]} ({len(qid_batch)} QIDs)...")
+        with _stage('entity_fetch'):
+            entities = fetch_complete_entities_batch(qid_batch, **(projection or FULL_PROJECTION))
+        if hierarchy is not None:
+            # Resolve the classes of the whole batch together, in the fewest requests
+            with _stage('category_rollup'):
+                hierarchy.ensure(qid for entity in entities.values() if 'error' not in entity
+                                 for qids in category_source_qids(entity.get('claims', {})).values()
+                                 for qid in qids)
+        rows = []
+        if statements is not None:
+            with _stage('statement_flatten'):
+                rows = [row for qid in qid_batch if "error" not in entities[qid]
+                        for row in statement_rows(qid, entities[qid])]
+        if profiler is not None:
+            return [profiler.profile(process_single_qid, qid, entities[qid]) for qid in qid_batch], rows
+        return [process_single_qid(qid, entities[qid]) for qid in qid_batch], rows
+
+    qid_batches = list(_chunk_list(qid_list, MAX_IDS_PER_REQUEST))
+
+    try:
+        with open(output_filename, 'a' if resume else 'w', encoding='utf-8') as f:
+            if workers > 1:
+                executor = ThreadPoolExecutor(max_workers=workers)
+                record_batches = executor.map(_process, qid_batches) # Yields results in input order
+            else:
+                executor = None
+                record_batches = map(_process, qid_batches)
+
             try:
-                # 1. Fetch raw entity data (using your existing function)
-                entity_data = fetch_complete_entity_data(qid)
+                for record_batch, statement_batch in record_batches:
+                    if statements is not None:
+                        # Ahead of the records, so a checkpoint below also covers their statements
+                        with _stage('write'):
+                            statements.write_rows(statement_batch)
+                    for record in record_batch:
+                        if record["status"] == "success":
+                            successful_count += 1
+                        else:
+                            failed_count += 1
+
+                        # 6. Write the final record (whether success or failure) to the JSONL file
+                        with _stage('write'):
+                            json_line = json.dumps(record, ensure_ascii=False)
+                            f.write(json_line + '\n')
+
+                            if (successful_count + failed_count) % checkpoint_every == 0:
+                                if statements is not None:
+                                    statements.checkpoint()
+                                f.flush()
+                                os.fsync(f.fileno())
+
+                        if metrics is not None:
+                            metrics.count_record(record)
+
+                    if store is not None:
+                        with _stage('write'):
+                            store.put_many(record_batch)
+                    if metrics is not None:
+                        metrics.maybe_write()
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+    finally:
+        set_request_rate_limit(None)
+        set_label_cache(None)
+        if label_cache is not None:
+            label_cache.close()
+        if store is not None:
+            store.close()
+        if statements is not None:
+            statements.close()
+        set_class_hierarchy(None)
+        if hierarchy is not None:
+            hierarchy.close()
+        set_metrics(None)
+        if metrics is not None:
+            metrics.write()
+        if profiler is not None:
+            profiler.save()
+    
+    print("\n--- Processing Complete ---")
+    print(f"Total Processed: {len(qid_list)}")
+    print(f"Successful Records: {successful_count}")
+    print(f"Failed Records: {failed_count}")
+    if label_cache is not None:
+        cache_stats = label_cache.stats()
+        print(f"Label Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.1%} hit rate)")
+    if hierarchy is not None:
+        print(f"Class Hierarchy: {hierarchy.fetch_requests} subclass-of requests")
+    if statements is not None:
+        print(f"Statements: {statements.rows_written} rows written to {len(statements.parts)} "
+              f"part-files in '{statements_path}'")
+    if metrics is not None:
+        for stage, stage_stats in metrics.snapshot()['stages'].items():
+            print(f"Stage {stage}: {stage_stats['sum_seconds']:.2f}s over {stage_stats['count']} calls")
+        print(f"Metrics written to '{metrics_prefix}.json' and '{metrics_prefix}.prom'.")
+    if profiler is not None and profiler.profiled:
+        print(f"Profiled {profiler.profiled} entities; stats saved to '{profiler.output_path}'.")
+    print("---------------------------\n")
 
-                if "error" in entity_data:
-                    # Handle API/Not Found error directly
-                    record["error_message"] = entity_data['error']
-                    failed_count += 1
-                else:
-                    # 2. Extract basic details
-                    entity_label = entity_data.get('labels', {}).get('en', {}).get('value', 'No label found')
-                    entity_description = entity_data.get('descriptions', {}).get('en', {}).get('value', 'No description found')
-                    claims = entity_data.get('claims', {})
-                    
-                    # 3. Get labels for the properties themselves (using your existing function)
-                    property_ids = list(claims.keys())
-                    property_labels = fetch_labels_for_qids(property_ids)
+def process_qids_two_phase(qid_list, output_filename="entity_data.jsonl", raw_filename=None, workers=1,
+                           max_requests_per_second=None, label_cache_path="label_cache.sqlite", projection=None,
+                           class_hierarchy_path=None):
+    """
+    Two-phase variant of process_qids_to_jsonl that writes the same records.
+
+    Phase 1 fetches every entity (in batches of MAX_IDS_PER_REQUEST) and stores
+    its raw claims, labels and descriptions in raw_filename. Phase 2 resolves the
+    union of all property and value IDs of the run at once, in the fewest
+    possible label requests, and then writes the labeled records. The number of
+    label requests therefore depends on the number of distinct IDs, not on the
+    number of entities. With class_hierarchy_path set, the classes behind the
+    category columns are resolved for the whole run at once as well.
+
+    Args:
+        qid_list (list): A list of QID strings (duplicates are processed once).
+        output_filename (str): The name of the JSONL file to write results to.
+        raw_filename (str): JSONL file for the raw phase 1 data (default: output_filename + '.raw').
+        workers (int): Number of concurrent worker threads (1 = sequential).
+        max_requests_per_second (float): Global API request limit (None = no limit).
+        label_cache_path (str): SQLite file for the label cache (None disables caching).
+        projection (dict): Entity projection (e.g. LEAN_PROJECTION) passed to the
+                           entity fetcher (None = FULL_PROJECTION).
+        class_hierarchy_path (str): SQLite file for the subclass-of index (None = no category columns).
+    """
+    qid_list = list(dict.fromkeys(qid_list))
+    raw_filename = raw_filename or output_filename + '.raw'
+
+    print(f"Starting two-phase processing for {len(qid_list)} QIDs.")
+    print(f"Results will be written to '{output_filename}'.")
+
+    successful_count = 0
+    failed_count = 0
+    label_ids = set()
+    category_ids = set()
+
+    set_request_rate_limit(max_requests_per_second)
+    label_cache = LabelCache(label_cache_path) if label_cache_path else None
+    set_label_cache(label_cache)
+    hierarchy = ClassHierarchy(fetch_complete_entities_batch, class_hierarchy_path) if class_hierarchy_path else None
+    set_class_hierarchy(hierarchy)
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    _map = executor.map if executor is not None else map
 
-                    if "error" in property_labels:
-                        # Fallback for label fetching error
-                        property_labels = {pid: pid for pid in property_ids} 
-                        print(f"  Warning: Failed to fetch property labels for {qid}. Using IDs.")
-                    
-                    # 4. Extract and label all claim values (using your existing function)
-                    labeled_claim_values = extract_labeled_claim_values(claims, property_labels)
-
-                    # 5. Structure the final dictionary for successful outcome
-                    record.update({
-                        "status": "success",
-                        "label": entity_label,
-                        "description": entity_description,
-                        "attributes": labeled_claim_values
-                    })
-                    record.pop("error_message") # Remove error key on success
+    try:
+        # Phase 1: fetch all entities and store their raw data
+        def _fetch(qid_batch):
+            print(f"Fetching {qid_batch[0]}..{qid_batch[-1]} ({len(qid_batch)} QIDs)...")
+            return fetch_complete_entities_batch(qid_batch, **(projection or FULL_PROJECTION))
+
+        with open(raw_filename, 'w', encoding='utf-8') as raw_file:
+            for entities in _map(_fetch, list(_chunk_list(qid_list, MAX_IDS_PER_REQUEST))):
+                for qid, entity_data in entities.items():
+                    if "error" not in entity_data:
+                        entity_data = {key: entity_data[key] for key in ('lastrevid', 'modified', 'labels', 'descriptions', 'claims')
+                                       if key in entity_data}
+                        entity_data.setdefault('claims', {})
+                        claims = entity_data['claims']
+                        label_ids.update(claims)
+                        label_ids.update(collect_value_qids(claims))
+                        for qids in category_source_qids(claims).values():
+                            category_ids.update(qids)
+                    raw_file.write(json.dumps({"QID": qid, "entity": entity_data}, ensure_ascii=False) + '\n')
+
+        # Phase 2: resolve the global set of property and value labels in 50-id batches
+        label_chunks = list(_chunk_list(sorted(label_ids), MAX_IDS_PER_REQUEST))
+        print(f"Resolving {len(label_ids)} distinct labels in {len(label_chunks)} batches...")
+        labels = {}
+        for chunk_labels in _map(fetch_labels_for_qids, label_chunks):
+            if "error" in chunk_labels:
+                print(f"  Warning: Could not resolve some labels: {chunk_labels['error']}")
+            else:
+                labels.update(chunk_labels)
+
+        if hierarchy is not None:
+            print(f"Resolving the class hierarchy of {len(category_ids)} distinct classes...")
+            hierarchy.ensure(category_ids)
+
+        with open(raw_filename, 'r', encoding='utf-8') as raw_file, \
+                open(output_filename, 'w', encoding='utf-8') as f:
+            for line in raw_file:
+                raw = json.loads(line)
+                record = process_single_qid(raw["QID"], raw["entity"], labels)
+                if record["status"] == "success":
                     successful_count += 1
-            
-            except Exception as e:
-                # Catch any unexpected execution errors
-                record["error_message"] = f"Unexpected execution error: {type(e).__name__} - {e}"
-                failed_count += 1
-
-            # 6. Write the final record (whether success or failure) to the JSONL file
-            json_line = json.dumps(record, ensure_ascii=False)
-            f.write(json_line + '\n')
-    
+                else:
+                    failed_count += 1
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        set_request_rate_limit(None)
+        set_label_cache(None)
+        if label_cache is not None:
+            label_cache.close()
+        set_class_hierarchy(None)
+        if hierarchy is not None:
+            hierarchy.close()
+
     print("\n--- Processing Complete ---")
     print(f"Total Processed: {len(qid_list)}")
     print(f"Successful Records: {successful_count}")
     print(f"Failed Records: {failed_count}")
+    print(f"Distinct Labels Resolved: {len(labels)} of {len(label_ids)}")
     print("---------------------------\n")
 
+def fetch_revision_ids(qids: list[str]):
+    """
+    Fetches the current revision id of many entities with cheap props=info requests
+    (up to MAX_IDS_PER_REQUEST ids per call).
+
+    Args:
+        qids (list[str]): A list of Wikidata Item IDs.
+
+    Returns:
+        dict: Maps each QID to its current 'lastrevid'. QIDs that are missing or whose
+              request failed are left out, so they are treated as changed.
+    """
+    revisions = {}
+    for qid_chunk in _chunk_list(list(qids), MAX_IDS_PER_REQUEST):
+        try:
+            data = _api_get(_entity_params(qid_chunk, 'info', None), timeout=10)
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            print(f"  Warning: Could not check revisions for chunk {qid_chunk[0]}..{qid_chunk[-1]}: {e}")
+            continue
+        if 'error' in data:
+            print(f"  Warning: Could not check revisions for chunk {qid_chunk[0]}..{qid_chunk[-1]}: {data['error']['info']}")
+            continue
+
+        for qid in qid_chunk:
+            entity_info = data.get('entities', {}).get(qid, {})
+            if 'lastrevid' in entity_info and 'missing' not in entity_info:
+                revisions[qid] = entity_info['lastrevid']
+    return revisions
+
+def refresh_qids_to_jsonl(qid_list, previous_filename, output_filename="entity_data.jsonl", **kwargs):
+    """
+    Incremental refresh of a previous run's output.
+
+    The current revision of every QID is checked with batched props=info calls.
+    Records whose stored 'lastrevid' still matches are carried forward from
+    previous_filename unchanged; only changed, new or previously failed entities
+    are fetched and labeled again with process_qids_to_jsonl.
+
+    With statements_path set (the statement directory of the run that wrote
+    previous_filename), the statements of the carried-forward entities are kept,
+    those of every other entity are removed, and the part-files of the refetched
+    entities are added.
+
+    Args:
+        qid_list (list): A list of QID strings (duplicates are processed once).
+        previous_filename (str): JSONL output of an earlier run.
+        output_filename (str): The name of the JSONL file to write results to
+                               (must differ from previous_filename).
+        **kwargs: Passed on to process_qids_to_jsonl (workers, max_requests_per_second,
+                  statements_path, ...).
+    """
+    if os.path.abspath(previous_filename) == os.path.abspath(output_filename):
+        raise ValueError("output_filename must differ from previous_filename")
+
+    qid_list = list(dict.fromkeys(qid_list))
+    wanted = set(qid_list)
+
+    # 1. Previous successful records that carry a revision id
+    previous = {}
+    if os.path.exists(previous_filename):
+        with open(previous_filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("QID") in wanted and record.get("status") == "success" and "lastrevid" in record:
+                    previous[record["QID"]] = record
+                elif record.get("QID") in previous:
+                    del previous[record["QID"]] # A later failed record supersedes it
+
+    # 2. Compare with the current revisions
+    print(f"Checking revisions of {len(previous)} previously fetched QIDs...")
+    # The revision checks count against the same limit as the fetches
+    if kwargs.get('rate_limiter') is not None:
+        _client.rate_limiter = kwargs['rate_limiter']
+    else:
+        set_request_rate_limit(kwargs.get('max_requests_per_second'))
+    try:
+        current_revisions = fetch_revision_ids(list(previous))
+    finally:
+        set_request_rate_limit(None)
+    unchanged = {qid for qid, record in previous.items() if current_revisions.get(qid) == record["lastrevid"]}
+    to_fetch = [qid for qid in qid_list if qid not in unchanged]
+    print(f"{len(unchanged)} unchanged, {len(to_fetch)} to fetch.")
+
+    # 3. Fetch only what changed, then merge everything back in input order
+    fetched = {}
+    changed_filename = output_filename + '.changed'
+    # The refetched statements go to a directory of their own: a non-resumed run
+    # clears its statement directory, which would drop the carried-forward ones
+    statements_path = kwargs.pop('statements_path', None)
+    changed_statements = statements_path.rstrip(os.sep) + '.changed' if statements_path else None
+    if to_fetch:
+        process_qids_to_jsonl(to_fetch, changed_filename, statements_path=changed_statements, **kwargs)
+        with open(changed_filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                fetched[record["QID"]] = record
+        os.remove(changed_filename)
+
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for qid in qid_list:
+            record = previous[qid] if qid in unchanged else fetched[qid]
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    if statements_path:
+        from statement_table import move_parts, retain_qids # Needs pyarrow
+        retain_qids(statements_path, unchanged)
+        if to_fetch:
+            move_parts(changed_statements, statements_path)
+
+    print(f"Refresh complete: {len(unchanged)} records carried forward, {len(fetched)} refetched.")
+
 if __name__ == "__main__":
     #test_one("Q83285") # Article about Durres
     #test_one("Q7186")  # Article about Marie Kurie
@@ -402,6 +1078,9 @@ if __name__ == "__main__":
     
     output_file = "entity_results.jsonl"
 
-    # Run the main function
-    process_qids_to_jsonl(qid_list_to_process, output_file)
+    # Run the main function (8 threads sharing a 10 requests/second budget).
+    # resume=True picks up where an interrupted run stopped; the class hierarchy adds
+    # is_sport/is_sports_team/is_sporting_event/is_athlete/... columns to every record.
+    process_qids_to_jsonl(qid_list_to_process, output_file, workers=8, max_requests_per_second=10, resume=True,
+                          class_hierarchy_path="class_hierarchy.sqlite")
 
@@ -0,0 +1,171 @@
+"""
+Data-access layer for FP_app.py.
+
+Streamlit re-runs the whole app script on every widget interaction, so the datasets and
+images are loaded here on demand (only for the page being shown) and memoized across
+reruns. The cache key includes the file's modification time, so editing or regenerating
+a file invalidates its cached copy. Datasets are also saved as Parquet next to
+their CSV, which is much faster to read than re-parsing the CSV. Figures
+are served from prerendered Plotly specs (see figure_cache.py).
+"""
+
+import os
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+from PIL import Image
+
+import app_figures
+from figure_cache import FIGURE_CACHE_DIR, FigureCache
+from views_cube import ViewsCube, build_cube, load_cube, save_cube
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Dataset name -> CSV file (page 3 reads the views cube instead of figure2_finaldata.csv)
+DATASETS = {
+    'figure1': 'figure1_finaldata.csv',
+    'figure3': 'figure3_finaldata.csv',
+}
+
+# Labeled article rows the views cube is aggregated from, and where the cube is saved
+CUBE_SOURCE = 'figure1_labeled_data.csv'
+CUBE_FILE = 'figure2_cube.parquet'
+
+IMAGES = {
+    'figure1': 'df1.png',
+    'figure3': 'df3.png',
+}
+
+# Figure name -> (data file it is built from, dataset name, figure function in app_figures.py)
+FIGURES = {
+    'sports_share_map': (DATASETS['figure1'], 'figure1', app_figures.sports_share_map),
+    'monthly_views_line': (CUBE_SOURCE, None, app_figures.monthly_views_line), # One per country
+    'human_counts_bar': (DATASETS['figure3'], 'figure3', app_figures.human_counts_bar),
+}
+
+
+def _path(filename):
+    return os.path.join(BASE_DIR, filename)
+
+
+FIGURE_CACHE = FigureCache(_path(FIGURE_CACHE_DIR))
+
+
+def _parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def _read_dataset(csv_path):
+    """
+    Reads the dataset from its Parquet copy when that is up to date, otherwise
+    parses the CSV and refreshes the Parquet copy.
+    """
+    parquet_path = _parquet_path(csv_path)
+    try:
+        if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return pd.read_parquet(parquet_path)
+    except ImportError:
+        pass # No Parquet engine installed; use the CSV
+
+    df = pd.read_csv(csv_path, index_col=False)
+
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except (ImportError, OSError):
+        pass # Parquet is only an optimization (e.g. read-only deployments)
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _load_dataset(name, mtime):
+    # mtime is only part of the cache key, so a changed file is read again
+    return _read_dataset(_path(DATASETS[name]))
+
+
+@st.cache_resource(show_spinner=False)
+def _load_image(filename, mtime):
+    image = Image.open(_path(filename))
+    image.load() # Decode now, so the cached object does not keep the file open
+    return image
+
+
+@st.cache_resource(show_spinner=False)
+def _load_views_cube(mtime):
+    # mtime is the labeled data's modification time; the saved cube is reused while newer
+    source_path = _path(CUBE_SOURCE)
+    cube_path = _path(CUBE_FILE)
+    try:
+        if os.path.exists(cube_path) and os.path.getmtime(cube_path) >= mtime:
+            return ViewsCube(load_cube(cube_path))
+    except ImportError:
+        pass # No Parquet engine installed; rebuild in memory
+
+    cube = build_cube(source_path)
+    try:
+        save_cube(cube, cube_path)
+    except (ImportError, OSError):
+        pass
+    return ViewsCube(cube)
+
+
+def load_dataset(name):
+    """
+    Returns the DataFrame for a dataset ('figure1' or 'figure3').
+    """
+    return _load_dataset(name, os.path.getmtime(_path(DATASETS[name])))
+
+
+def load_image(name):
+    """
+    Returns the decoded confusion-matrix image for a figure ('figure1' or 'figure3').
+    """
+    filename = IMAGES[name]
+    return _load_image(filename, os.path.getmtime(_path(filename)))
+
+
+def load_views_cube():
+    """
+    Returns the month x country x category ViewsCube, rebuilt when the labeled data changes.
+    """
+    return _load_views_cube(os.path.getmtime(_path(CUBE_SOURCE)))
+
+
+def figure_data(name, **params):
+    """
+    Returns the DataFrame a figure is built from (for page 3, the country's full month range).
+    """
+    if name == 'monthly_views_line':
+        return load_views_cube().slice(params['country'])
+    return load_dataset(FIGURES[name][1])
+
+
+@st.cache_data(show_spinner=False)
+def _load_figure_spec(name, params, mtime):
+    # mtime of the figure's data file keeps this in-memory copy in step with the spec cache
+    source, _, make_figure = FIGURES[name]
+    params = dict(params)
+    return FIGURE_CACHE.get_or_build(name, [_path(source)], params,
+                                     lambda: make_figure(figure_data(name, **params), **params))
+
+
+def load_figure(name, **params):
+    """
+    Returns a page's figure ('sports_share_map', 'monthly_views_line' with a country, or
+    'human_counts_bar') from its prerendered spec. Every call returns a new Figure, so the
+    caller can apply deltas (e.g. an axis range) without touching the cached spec.
+    """
+    source = FIGURES[name][0]
+    spec = _load_figure_spec(name, tuple(sorted(params.items())), os.path.getmtime(_path(source)))
+    return pio.from_json(spec)
+
+
+def all_figure_params():
+    """
+    Yields (figure name, parameters) for every figure the app can show.
+    """
+    yield 'sports_share_map', {}
+    for country in load_views_cube().countries:
+        yield 'monthly_views_line', {'country': country}
+    yield 'human_counts_bar', {}
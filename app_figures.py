@@ -0,0 +1,55 @@
+"""
+Plotly figures shown by FP_app.py, one function per page, so the figures can be built
+(and timed by benchmark_suite.py) without running the Streamlit app.
+"""
+
+import plotly.express as px
+
+
+def sports_share_map(df1):
+    """
+    Page 2: choropleth of the share of sports articles per country (figure1 data).
+    """
+    return px.choropleth(
+        df1,
+        locations='country',
+        locationmode='country names',
+        color='sports_percentage',
+        color_continuous_scale='Blues',
+        title='Percentage of Sports Articles by Country',
+        labels={"sports_percentage": "% Sports Articles"},
+        width=800,
+        height=600)
+
+
+def monthly_views_line(filtered, country):
+    """
+    Page 3: monthly views per category for one country (a ViewsCube slice).
+    """
+    fig2 = px.line(
+        filtered,
+        x='month',
+        y='views',
+        color='category',
+        title=f'Monthly Views: Sports vs Not Sports ({country})',
+        markers=True)
+
+    fig2.update_layout(
+        xaxis_title='Month',
+        yaxis_title='Total Views',
+        legend_title='Category'
+    )
+    return fig2
+
+
+def human_counts_bar(df3):
+    """
+    Page 4: number of human articles per category (figure3 data).
+    """
+    return px.bar(
+        df3,
+        x='category',
+        y='count',
+        color='category',
+        title='Number of Sports articles related to humans',
+        text='count')
@@ -0,0 +1,69 @@
+"""
+Text of FP_app.py's pages, shared with the static snapshot export in figure_cache.py so
+both show the same pages.
+"""
+
+# Page key -> sidebar label (the page title is 'Spanish wikipedia articles: <label>')
+ANALYSIS_OPTIONS = {
+    "1":"Main Page",
+    "2": "Percentage of Sports Articles by Country",
+    "3": "Views of Sports vs. Not sports spanish wikipedia articles between 2023-2024 months",
+    "4":  "Number of Sports articles related to humans"
+}
+
+TITLE_PREFIX = "Spanish wikipedia articles: "
+
+# Page 1, as the Markdown blocks passed to st.write
+MAIN_PAGE = [
+    '## Research questions:',
+    'How many Spanish articles from es.wikipedia are related to Sports?',
+
+    '## Hypothesis:',
+    '**We hypothesize that spanish articles for spanish speaking countries will have more sports related articles than other countries.',
+
+    '## Data',
+    'We worked with spanish articles in the es.wikpedia from the months of 2023-2024 using their means and sums to generate our figures.',
+
+    '## Steps taken:',
+    """
+    1. **We first seperated rows bewtween  dataframes containing humans and non humans articles. This was determined through , the instance of:, attribute.**
+    2. **Then we created a column that would contain teh text we would classify by, either a description or title for those missing a description.**
+    3. **Then we cleaned up the teh data in these columns by removing special characters, stopwords, and spaces of the items you are looking at.**
+    4. **Finally we did naive bayes classification on both dataframes to classify them as sports and not sports**
+    [The latter was attempted after failing to categorize articles with zero-shot classification]""",
+    '## Key Takeaways',
+    """Categorizing data with small text samples in dfferent languages can prove difficult due to the high variation of vocabulary
+    and also grammar that varies across languages. In addition the categorical information provided by online articles can be hard to access 
+    and even possible lead to having inaccurate results""",
+    '## Gen AI',
+    'Generative AI was used to identify models for zero shot classifcation that would be multilingual when applied to a single comlumn containing both english and spanish'
+    'additionally, gen AI was also utilize to check if figures where being generated correctly and to understand hwo to make them fit properly on the streamlit app. ',
+]
+
+# Figure pages: page key -> (header, summary, method note)
+PAGE_INTROS = {
+    "2": ("1. Top article fraction of top 400 viewed article in 2024-2023 months per country in 2023-02",
+          "Examine the fraction of categories of spanish articles read across different countries with the most views.",
+          'Data was categorized using the descriptions components and each article and then performing naive bayes classification. '),
+    "3": ("2. Views of Sports vs. Not sports spanish wikipedia articles between 2023-2024 months",
+          "Compare the views between spanish article in 2024-2023 months.",
+          'Data was categorized using the descriptions components and each article and then performing naive bayes classification.'),
+    "4": ("3. Category counts of sports articles for humans",
+          "Comapre the spanish articles about humans related to sports in 2024-2023 months.",
+          'Data was categorized using the descriptions components and each article and then performing naive bayes classification '),
+}
+
+# Figure name (see app_data.FIGURES) -> the page showing it
+FIGURE_PAGES = {
+    'sports_share_map': "2",
+    'monthly_views_line': "3",
+    'human_counts_bar': "4",
+}
+
+# Page key -> (image name in app_data.IMAGES, caption) of the confusion matrix shown under the data
+PAGE_IMAGES = {
+    "2": ('figure1', "Confussion matrix for categorizing dataframe for figure 1 and 2"),
+    "4": ('figure3', "Confussion matrix for categorizing dataframe for figure 3"),
+}
+
+DATA_SNIPPET_CAPTION = "Snippet of data used to represent categories"
@@ -0,0 +1,265 @@
+"""
+Microbenchmark and regression suite for the CPU-bound parts of the pipeline:
+
+    extract_claims   extract_labeled_claim_values (4_get_wikidata.py), rows = claims extracted
+    figure1          sports_share_by_country (figure_data.py), rows = labeled articles
+    figure2          monthly_views_by_category (figure_data.py)
+    figure3          category_counts (figure_data.py)
+    app_figures      building and serializing the three FP_app.py figures from those aggregates
+
+Inputs are synthetic and deterministic (seeded), and scale from 10^3 to 10^7 rows. Each
+benchmark reports its best wall time over --repeat runs (after one warm-up run) and its
+peak traced memory (tracemalloc, measured in a separate run so it does not slow the timed
+ones). Results are saved as JSON; --compare checks them against a saved baseline and exits with status 1
+if any benchmark got slower or bigger than the --threshold allows.
+
+Usage:
+    python benchmark_suite.py --scales 1000 100000 1000000 --output baseline.json
+    python benchmark_suite.py --scales 1000 100000 1000000 --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import app_figures
+import figure_data
+from wikidata_loader import load_get_wikidata
+
+COUNTRIES = ['Mexico', 'Argentina', 'Chile', 'Colombia', 'Peru', 'Spain', 'Venezuela', 'Ecuador',
+             'Guatemala', 'Bolivia', 'Cuba', 'Dominican Republic', 'Honduras', 'Paraguay', 'Uruguay',
+             'El Salvador', 'Nicaragua', 'Costa Rica', 'Panama', 'United States']
+MONTHS = [f'{year}-{month:02d}' for year in (2023, 2024) for month in range(1, 13)]
+
+# Distinct synthetic entities; larger claim scales cycle through them
+ENTITY_POOL_SIZE = 1000
+CLAIMS_PER_ENTITY = 30
+
+DEFAULT_SCALES = [10**3, 10**4, 10**5]
+BENCHMARKS = ('extract_claims', 'figure1', 'figure2', 'figure3', 'app_figures')
+
+
+def _snak(prop, value_type, value):
+    return {'mainsnak': {'snaktype': 'value', 'property': prop,
+                         'datavalue': {'type': value_type, 'value': value}},
+            'type': 'statement', 'rank': 'normal'}
+
+
+def synthetic_claims(seed=0):
+    """
+    Builds ENTITY_POOL_SIZE claim sets of CLAIMS_PER_ENTITY properties each, mixing all the
+    value types extract_labeled_claim_values handles, plus the labels they need.
+
+    Returns:
+        tuple: (list of claims dicts, property labels, value labels)
+    """
+    rng = np.random.default_rng(seed)
+    value_types = ['wikibase-entityid', 'string', 'external-id', 'quantity', 'time',
+                   'globecoordinate', 'monolingualtext']
+    entities = []
+    value_qids = set()
+    for _ in range(ENTITY_POOL_SIZE):
+        claims = {}
+        for pid in rng.choice(np.arange(1, 3000), CLAIMS_PER_ENTITY, replace=False):
+            prop = f'P{pid}'
+            value_type = value_types[pid % len(value_types)]
+            if value_type == 'wikibase-entityid':
+                qid = f'Q{rng.integers(1, 5000)}'
+                value_qids.add(qid)
+                value = {'entity-type': 'item', 'id': qid}
+            elif value_type == 'quantity':
+                unit = '1' # Dimensionless
+                if rng.random() < 0.5:
+                    unit = f'Q{rng.integers(1, 50)}'
+                    value_qids.add(unit)
+                value = {'amount': f'+{rng.integers(1, 10**6)}',
+                         'unit': unit if unit == '1' else f'http://www.wikidata.org/entity/{unit}'}
+            elif value_type == 'time':
+                value = {'time': f'+{rng.integers(1900, 2024)}-01-01T00:00:00Z', 'precision': 11}
+            elif value_type == 'globecoordinate':
+                value = {'latitude': float(rng.uniform(-90, 90)), 'longitude': float(rng.uniform(-180, 180))}
+            elif value_type == 'monolingualtext':
+                value = {'text': f'texto {rng.integers(10**6)}', 'language': 'es'}
+            else:
+                value = f'value-{rng.integers(10**6)}'
+            # Some properties have several statements; only the first is extracted
+            claims[prop] = [_snak(prop, value_type, value)] * int(rng.integers(1, 4))
+        entities.append(claims)
+
+    property_labels = {f'P{pid}': f'property {pid}' for pid in range(1, 3000)}
+    value_labels = {qid: f'label {qid}' for qid in value_qids}
+    return entities, property_labels, value_labels
+
+
+def synthetic_labeled_views(rows, seed=0):
+    """
+    Builds a labeled article table shaped like figure1_labeled_data.csv.
+
+    String columns reference a few shared string objects, as pandas' CSV reader would
+    produce for repeated values, so 10^7 rows still fit in memory.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date': np.array(MONTHS, dtype=object)[rng.integers(0, len(MONTHS), rows)],
+        'country': np.array(COUNTRIES, dtype=object)[rng.integers(0, len(COUNTRIES), rows)],
+        'views': rng.integers(1_000, 2_000_000, rows),
+        'categories_generated': np.array(['Sports', 'Not Sports'], dtype=object)[(rng.random(rows) < 0.3).astype(int)],
+    })
+
+
+def _build_app_figures(figure1, figure2, figure3):
+    """
+    Builds the three FP_app.py figures and serializes them as the app does when rendering.
+    """
+    line_data = figure2.rename(columns={'categories_generated': 'category'})
+    figures = [app_figures.sports_share_map(figure1),
+               app_figures.monthly_views_line(line_data, 'All countries'),
+               app_figures.human_counts_bar(figure3)]
+    return [figure.to_json() for figure in figures]
+
+
+def make_benchmark(name, rows, seed=0):
+    """
+    Prepares the inputs of one benchmark at one scale.
+
+    Returns:
+        callable: A zero-argument function running the measured step once.
+    """
+    if name == 'extract_claims':
+        extract = load_get_wikidata().extract_labeled_claim_values
+        entities, property_labels, value_labels = synthetic_claims(seed)
+        batches = -(-rows // CLAIMS_PER_ENTITY) # One claim set is CLAIMS_PER_ENTITY rows
+
+        def run():
+            for i in range(batches):
+                extract(entities[i % ENTITY_POOL_SIZE], property_labels, value_labels)
+        return run
+
+    labeled = synthetic_labeled_views(rows, seed)
+    if name == 'figure1':
+        return lambda: figure_data.sports_share_by_country(labeled)
+    if name == 'figure2':
+        return lambda: figure_data.monthly_views_by_category(labeled)
+    if name == 'figure3':
+        return lambda: figure_data.category_counts(labeled)
+    if name == 'app_figures':
+        aggregates = (figure_data.sports_share_by_country(labeled),
+                      figure_data.monthly_views_by_category(labeled),
+                      figure_data.category_counts(labeled))
+        return lambda: _build_app_figures(*aggregates)
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def measure(run, repeat=3):
+    """
+    Returns:
+        dict: Best wall time in seconds over repeat runs, and the peak traced memory in bytes.
+    """
+    run() # Warm-up: imports, lazy initialization and caches are not part of the measurement
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_suite(scales=DEFAULT_SCALES, benchmarks=BENCHMARKS, repeat=3, seed=0):
+    """
+    Runs every benchmark at every scale.
+
+    Returns:
+        dict: 'environment' (versions) and 'results' (one entry per benchmark and scale).
+    """
+    results = []
+    for rows in scales:
+        for name in benchmarks:
+            result = {'benchmark': name, 'rows': rows, **measure(make_benchmark(name, rows, seed), repeat)}
+            results.append(result)
+            print(_format_row(result))
+    return {
+        'environment': {'python': sys.version.split()[0], 'pandas': pd.__version__,
+                        'numpy': np.__version__, 'platform': platform.platform()},
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_seconds=0.005):
+    """
+    Finds benchmarks that regressed against a baseline.
+
+    Args:
+        baseline (dict): A run_suite result loaded from a baseline file.
+        current (dict): The run_suite result to check.
+        threshold (float): Allowed relative increase (0.2 = 20% slower or bigger).
+        min_seconds (float): Time differences below this are treated as noise.
+
+    Returns:
+        list[dict]: One entry per regressed metric (benchmark, rows, metric, baseline, current, change).
+    """
+    base = {(r['benchmark'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = base.get((result['benchmark'], result['rows']))
+        if before is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            old, new = before[metric], result[metric]
+            if metric == 'seconds' and new - old < min_seconds:
+                continue
+            if old and new > old * (1 + threshold):
+                regressions.append({'benchmark': result['benchmark'], 'rows': result['rows'], 'metric': metric,
+                                    'baseline': old, 'current': new, 'change': new / old - 1})
+    return regressions
+
+
+def _format_row(result):
+    return (f"{result['benchmark']:>15} {result['rows']:>10} {result['seconds']:>10.4f} "
+            f"{result['peak_bytes'] / 2**20:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Microbenchmarks for claim extraction, aggregations and app figures.')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help='Row counts to run every benchmark at (10^3 to 10^7).')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (the best is kept).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to this JSON file (e.g. a new baseline).')
+    parser.add_argument('--compare', metavar='BASELINE', help='Baseline JSON file to check the results against.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative regression.')
+    args = parser.parse_args()
+
+    print(f"{'benchmark':>15} {'rows':>10} {'seconds':>10} {'peak MiB':>10}")
+    suite = run_suite(args.scales, args.benchmarks, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(suite, f, indent=2)
+        print(f"Results written to '{args.output}'.")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), suite, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} @ {regression['rows']} rows: {regression['metric']} "
+                  f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.")
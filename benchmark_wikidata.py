@@ -0,0 +1,145 @@
+"""
+Throughput benchmark for process_qids_to_jsonl in 4_get_wikidata.py, run offline against
+the local stand-in API in mock_wikidata_server.py.
+
+For every scale it reports entities per second, API requests per entity and the
+p50/p99 latency of single API requests as seen by the extractor.
+
+Usage:
+    python benchmark_wikidata.py --scales 100 1000 5000 --workers 8 --latency 0.02
+    python benchmark_wikidata.py --qids-csv 2024_2023_wikiSpanish_qid.csv --json bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from mock_wikidata_server import MockWikidataServer, load_fixture
+from wikidata_loader import load_get_wikidata
+
+
+def percentile(values, pct):
+    """
+    Returns the pct-th percentile (nearest rank) of values, or None for an empty list.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def run_benchmark(qids, server, workers=1, max_requests_per_second=None, label_cache=False, projection=None):
+    """
+    Runs process_qids_to_jsonl once for qids against a running mock server.
+
+    Args:
+        qids (list[str]): QIDs to process.
+        server (MockWikidataServer): A started mock server.
+        workers (int): Worker threads passed to process_qids_to_jsonl.
+        max_requests_per_second (float): Rate limit passed to process_qids_to_jsonl.
+        label_cache (bool): Use a (fresh, cold) label cache for the run.
+        projection (dict): Entity projection passed to process_qids_to_jsonl.
+
+    Returns:
+        dict: Timing and request statistics for the run.
+    """
+    get_wikidata = load_get_wikidata()
+    get_wikidata.WIKIDATA_API_ENDPOINT = server.url
+    server.reset_stats()
+
+    latencies = []
+    latencies_lock = threading.Lock()
+    original_api_get = get_wikidata._api_get
+
+    def timed_api_get(params, timeout=10):
+        start = time.perf_counter()
+        try:
+            return original_api_get(params, timeout=timeout)
+        finally:
+            elapsed = time.perf_counter() - start
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    get_wikidata._api_get = timed_api_get
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, 'bench.jsonl')
+            cache_path = os.path.join(tmp_dir, 'labels.sqlite') if label_cache else None
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                get_wikidata.process_qids_to_jsonl(
+                    qids, output_path, workers=workers,
+                    max_requests_per_second=max_requests_per_second, label_cache_path=cache_path,
+                    projection=projection)
+            elapsed = time.perf_counter() - start
+            output_bytes = os.path.getsize(output_path)
+    finally:
+        get_wikidata._api_get = original_api_get
+
+    return {
+        'entities': len(qids),
+        'workers': workers,
+        'label_cache': label_cache,
+        'seconds': elapsed,
+        'entities_per_second': len(qids) / elapsed if elapsed else None,
+        'requests': server.request_count,
+        'requests_per_entity': server.request_count / len(qids) if qids else None,
+        'throttled_requests': server.throttled_count,
+        'latency_p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'latency_p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'output_bytes': output_bytes,
+    }
+
+
+def _format_row(result):
+    return (f"{result['entities']:>9} {result['workers']:>7} {result['seconds']:>9.2f} "
+            f"{result['entities_per_second']:>12.1f} {result['requests_per_entity']:>10.3f} "
+            f"{result['latency_p50_ms'] or 0:>9.2f} {result['latency_p99_ms'] or 0:>9.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline throughput benchmark for process_qids_to_jsonl.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='Numbers of QIDs to process.')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-rps', type=float, default=None, help='Requests-per-second limit.')
+    parser.add_argument('--label-cache', action='store_true', help='Run with a cold label cache.')
+    parser.add_argument('--lean', action='store_true', help='Fetch with LEAN_PROJECTION.')
+    parser.add_argument('--qids-csv', help="CSV with a 'qid' column to take QIDs from (default: synthetic).")
+    parser.add_argument('--fixture', help='Recorded fixture JSON for the mock server.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latency injected by the mock server.')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of 429 responses.')
+    parser.add_argument('--json', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    if args.qids_csv:
+        import pandas as pd
+        all_qids = list(dict.fromkeys(pd.read_csv(args.qids_csv)['qid'].tolist()))
+    else:
+        all_qids = [f'Q{100000 + i}' for i in range(max(args.scales))]
+
+    results = []
+    with MockWikidataServer(fixture=load_fixture(args.fixture) if args.fixture else None,
+                            latency=args.latency, rate_429=args.rate_429) as server:
+        # Keep retries fast: the mock server sends Retry-After: 0
+        load_get_wikidata()._client.backoff_base = 0.01
+
+        print(f"{'entities':>9} {'workers':>7} {'seconds':>9} {'entities/s':>12} {'req/entity':>10} "
+              f"{'p50 ms':>9} {'p99 ms':>9}")
+        for scale in args.scales:
+            result = run_benchmark(all_qids[:scale], server, workers=args.workers,
+                                   max_requests_per_second=args.max_rps, label_cache=args.label_cache,
+                                   projection=load_get_wikidata().LEAN_PROJECTION if args.lean else None)
+            results.append(result)
+            print(_format_row(result))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to '{args.json}'.")
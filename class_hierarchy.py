@@ -0,0 +1,198 @@
+"""
+Persistent 'subclass of' (P279) closure index for rolling 'instance of' (P31) and
+'occupation' (P106) values up to broad categories such as sports team, sporting event
+or athlete.
+
+The P279 edges of every class reached from those values are fetched once (in
+batched wbgetentities calls), stored in a SQLite file, and their transitive closure
+(class -> all of its ancestors) is precomputed and stored as well. Checking whether an
+entity is a kind of 'sporting event' is then a set lookup, with no graph walk over the
+network, and the hierarchy is reused by every later entity and run.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Rolled-up category columns added to each record -> (property whose values are
+# rolled up, the class they test for). People are instances of 'human' (P31=Q5),
+# so whether someone is an athlete comes from their occupations (P106).
+CATEGORY_ROOTS = {
+    'is_human': ('P31', 'Q5'),
+    'is_sport': ('P31', 'Q349'),
+    'is_sports_team': ('P31', 'Q12973014'),
+    'is_sporting_event': ('P31', 'Q16510064'),
+    'is_athlete': ('P106', 'Q2066131'),
+}
+
+# Properties whose values CATEGORY_ROOTS rolls up
+CATEGORY_PROPERTIES = sorted({pid for pid, _ in CATEGORY_ROOTS.values()})
+
+MAX_IDS_PER_REQUEST = 50
+
+
+class ClassHierarchy:
+    """
+    SQLite-backed P279 graph with a precomputed transitive closure.
+
+    Args:
+        fetch_entities (callable): Called as fetch_entities(ids, props='claims', languages=None,
+            properties=['P279']) and returning id -> entity data or error dict; in
+            4_get_wikidata.py this is fetch_complete_entities_batch.
+        path (str): SQLite file to store the hierarchy in.
+        max_depth (int): Maximum number of P279 levels followed above a rolled-up value.
+    """
+
+    def __init__(self, fetch_entities, path="class_hierarchy.sqlite", max_depth=25):
+        self.fetch_entities = fetch_entities
+        self.path = path
+        self.max_depth = max_depth
+        self.fetch_requests = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fetched_classes (class TEXT PRIMARY KEY, fetched_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS subclass_edges (class TEXT NOT NULL, parent TEXT NOT NULL,
+                                                       PRIMARY KEY (class, parent));
+            CREATE TABLE IF NOT EXISTS closure (class TEXT NOT NULL, ancestor TEXT NOT NULL,
+                                                PRIMARY KEY (class, ancestor));
+        """)
+
+        self._fetched = {row[0] for row in self._conn.execute("SELECT class FROM fetched_classes")}
+        self._parents = {}
+        for child, parent in self._conn.execute("SELECT class, parent FROM subclass_edges"):
+            self._parents.setdefault(child, set()).add(parent)
+        self._ancestors = {}
+        for cls, ancestor in self._conn.execute("SELECT class, ancestor FROM closure"):
+            self._ancestors.setdefault(cls, {cls}).add(ancestor)
+
+    def _fetch_parents(self, classes):
+        """
+        Fetches and stores the P279 parents of classes.
+        """
+        now = time.time()
+        for start in range(0, len(classes), MAX_IDS_PER_REQUEST):
+            chunk = classes[start:start + MAX_IDS_PER_REQUEST]
+            entities = self.fetch_entities(chunk, props='claims', languages=None, properties=['P279'])
+            self.fetch_requests += 1
+
+            edges = []
+            fetched = []
+            for cls in chunk:
+                entity = entities.get(cls, {})
+                error = entity.get('error', '')
+                if error and 'missing' not in error and 'not found' not in error:
+                    continue # Network/API failure: try this class again next time
+                parents = set()
+                for statement in entity.get('claims', {}).get('P279', []):
+                    data_value = statement.get('mainsnak', {}).get('datavalue', {})
+                    if data_value.get('type') == 'wikibase-entityid':
+                        parents.add(data_value['value']['id'])
+                self._parents[cls] = parents
+                self._fetched.add(cls)
+                fetched.append((cls, now))
+                edges.extend((cls, parent) for parent in parents)
+
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO fetched_classes VALUES (?, ?)", fetched)
+                self._conn.executemany("INSERT OR IGNORE INTO subclass_edges VALUES (?, ?)", edges)
+
+    def ensure(self, classes):
+        """
+        Makes sure the closure of every class is known, fetching missing P279 levels
+        breadth-first (one batched request per 50 unknown classes per level).
+
+        Args:
+            classes (iterable): Class QIDs (P31 or P106 values).
+        """
+        with self._lock:
+            pending = [cls for cls in set(classes) if cls not in self._ancestors]
+            if not pending:
+                return
+
+            failed = set()
+            for _ in range(self.max_depth):
+                frontier = self._unfetched_reachable(pending) - failed
+                if not frontier:
+                    break
+                self._fetch_parents(sorted(frontier))
+                failed |= frontier - self._fetched
+
+            rows = []
+            for cls in pending:
+                ancestors = self._compute_ancestors(cls)
+                self._ancestors[cls] = ancestors
+                # Incomplete closures (failed fetches, max_depth) are only kept for this run
+                if not self._unfetched_reachable([cls]):
+                    rows.extend((cls, ancestor) for ancestor in ancestors)
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO closure VALUES (?, ?)", rows)
+
+    def _unfetched_reachable(self, classes):
+        """
+        Returns the classes reachable from classes over stored P279 edges whose own
+        parents have not been fetched yet (the next level to fetch).
+        """
+        unfetched = set()
+        seen = set()
+        queue = deque(classes)
+        while queue:
+            cls = queue.popleft()
+            if cls in seen:
+                continue
+            seen.add(cls)
+            if cls in self._fetched:
+                queue.extend(self._parents.get(cls, ()))
+            else:
+                unfetched.add(cls)
+        return unfetched
+
+    def _compute_ancestors(self, cls):
+        ancestors = {cls}
+        queue = deque([cls])
+        while queue:
+            for parent in self._parents.get(queue.popleft(), ()):
+                if parent not in ancestors: # P279 has cycles; visit each class once
+                    ancestors.add(parent)
+                    queue.append(parent)
+        return ancestors
+
+    def ancestors(self, cls):
+        """
+        Returns the set of cls and all of its (transitive) superclasses.
+        """
+        if cls not in self._ancestors:
+            self.ensure([cls])
+        return self._ancestors.get(cls, {cls})
+
+    def is_a(self, cls, root):
+        """
+        True if cls is root or a (transitive) subclass of root.
+        """
+        return root in self.ancestors(cls)
+
+    def rollup(self, values_by_property, roots=CATEGORY_ROOTS):
+        """
+        Rolls an entity's P31/P106 values up to the broad categories.
+
+        Args:
+            values_by_property (dict): Property ID -> the entity's value QIDs for it
+                                       (e.g. {'P31': ['Q5'], 'P106': ['Q937857']}).
+            roots (dict): Column name -> (property ID, root class QID).
+
+        Returns:
+            dict: Column name -> True if any value of the column's property is a kind
+                  of its root class.
+        """
+        self.ensure(qid for qids in values_by_property.values() for qid in qids)
+        ancestors = {}
+        for pid, qids in values_by_property.items():
+            ancestors[pid] = set()
+            for cls in qids:
+                ancestors[pid] |= self._ancestors.get(cls, {cls})
+        return {column: root in ancestors.get(pid, ()) for column, (pid, root) in roots.items()}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
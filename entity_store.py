@@ -0,0 +1,234 @@
+"""
+Indexed storage for the entity records written by process_qids_to_jsonl.
+
+Records live in a SQLite file with the QID as primary key, so a single entity can be
+looked up without reading the whole entity_results.jsonl, records can be streamed one
+at a time, and selected attributes ('instance of', 'country', 'date of birth', ...) can
+be exported as flat columns. Attribute values are also kept in their own indexed table,
+so the export does not have to decode every record.
+
+Usage:
+    python entity_store.py import entity_results.jsonl --store entities.sqlite
+    python entity_store.py export --store entities.sqlite --attributes "instance of" country \\
+        --output entity_attributes.csv
+    python entity_store.py join student_project_data.csv --store entities.sqlite \\
+        --attributes "instance of" --output joined.csv
+"""
+
+import argparse
+import json
+import sqlite3
+
+import pandas as pd
+
+
+class EntityStore:
+    """
+    SQLite-backed store of entity records keyed by QID.
+
+    Args:
+        path (str): SQLite file to store the records in.
+    """
+
+    def __init__(self, path="entities.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                qid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                label TEXT,
+                description TEXT,
+                record TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS attributes (
+                qid TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (qid, name)
+            );
+            CREATE INDEX IF NOT EXISTS attributes_by_name ON attributes (name, qid);
+        """)
+
+    def put_many(self, records):
+        """
+        Inserts or replaces records (dicts in the process_qids_to_jsonl format).
+
+        Args:
+            records (iterable): Records with at least 'QID' and 'status' keys.
+
+        Returns:
+            int: The number of records stored.
+        """
+        count = 0
+        with self._conn:
+            for record in records:
+                qid = record["QID"]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entities (qid, status, label, description, record) VALUES (?, ?, ?, ?, ?)",
+                    (qid, record["status"], record.get("label"), record.get("description"),
+                     json.dumps(record, ensure_ascii=False)),
+                )
+                self._conn.execute("DELETE FROM attributes WHERE qid = ?", (qid,))
+                attributes = record.get("attributes") or {}
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO attributes (qid, name, value) VALUES (?, ?, ?)",
+                    [(qid, name, value if isinstance(value, str) else json.dumps(value, ensure_ascii=False))
+                     for name, value in attributes.items()],
+                )
+                count += 1
+        return count
+
+    def put(self, record):
+        self.put_many([record])
+
+    def get(self, qid):
+        """
+        Returns the record stored for qid, or None.
+        """
+        row = self._conn.execute("SELECT record FROM entities WHERE qid = ?", (qid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __contains__(self, qid):
+        return self._conn.execute("SELECT 1 FROM entities WHERE qid = ?", (qid,)).fetchone() is not None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def iter_records(self, status=None):
+        """
+        Streams the stored records one at a time, in QID order.
+
+        Args:
+            status (str): Only yield records with this status (e.g. 'success').
+        """
+        if status is None:
+            cursor = self._conn.execute("SELECT record FROM entities ORDER BY qid")
+        else:
+            cursor = self._conn.execute("SELECT record FROM entities WHERE status = ? ORDER BY qid", (status,))
+        for (record,) in cursor:
+            yield json.loads(record)
+
+    def completed_qids(self):
+        """
+        Returns the set of QIDs stored with status 'success'.
+        """
+        return {qid for (qid,) in self._conn.execute("SELECT qid FROM entities WHERE status = 'success'")}
+
+    def import_jsonl(self, jsonl_path, batch_size=1000):
+        """
+        Loads a JSONL file written by process_qids_to_jsonl. Later lines replace earlier ones.
+
+        Returns:
+            int: The number of records imported.
+        """
+        count = 0
+        batch = []
+        with open(jsonl_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    count += self.put_many(batch)
+                    batch = []
+        return count + self.put_many(batch)
+
+    def export_columns(self, attributes, qids=None):
+        """
+        Returns one row per successful entity with the selected attributes as flat columns.
+
+        Args:
+            attributes (list[str]): Attribute labels to export (e.g. ['instance of', 'country']).
+            qids (list[str]): Only export these QIDs (default: all).
+
+        Returns:
+            pd.DataFrame: Columns qid, label, description and one column per attribute.
+        """
+        # Attribute labels are bound as parameters and the columns get positional aliases
+        # (a0, a1, ...), so no label is ever part of the SQL text; they are renamed below
+        columns = ", ".join(
+            f"(SELECT value FROM attributes a WHERE a.qid = e.qid AND a.name = ?) AS a{i}"
+            for i in range(len(attributes))
+        )
+        query = f"SELECT e.qid, e.label, e.description{', ' + columns if columns else ''} FROM entities e WHERE e.status = 'success'"
+        params = list(attributes)
+        names = {f"a{i}": name for i, name in enumerate(attributes)}
+
+        if qids is None:
+            return pd.read_sql_query(query, self._conn, params=params).rename(columns=names)
+
+        # SQLite limits the number of bound variables per statement
+        frames = []
+        qids = list(dict.fromkeys(qids))
+        for start in range(0, len(qids), 500):
+            chunk = qids[start:start + 500]
+            frames.append(pd.read_sql_query(
+                f"{query} AND e.qid IN ({','.join('?' * len(chunk))})", self._conn, params=params + chunk))
+        if not frames:
+            return pd.read_sql_query(query + " AND 0", self._conn, params=params).rename(columns=names)
+        return pd.concat(frames, ignore_index=True).rename(columns=names)
+
+    def join_csv(self, csv_path, attributes, output_path, qid_column='qid', chunksize=50_000):
+        """
+        Left-joins a CSV (e.g. student_project_data.csv) with the selected attributes,
+        reading and writing it chunk by chunk so neither side has to fit in memory.
+
+        Args:
+            csv_path (str): Input CSV with a QID column.
+            attributes (list[str]): Attribute labels to add as columns.
+            output_path (str): Where to write the joined CSV.
+            qid_column (str): Name of the QID column in the CSV.
+            chunksize (int): Rows per chunk.
+        """
+        first = True
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            columns = self.export_columns(attributes, chunk[qid_column].dropna().unique().tolist())
+            columns = columns.rename(columns={'qid': qid_column, 'label': 'entity_label',
+                                              'description': 'entity_description'})
+            joined = chunk.merge(columns, on=qid_column, how='left', validate='many_to_one')
+            joined.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+            first = False
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Indexed store for Wikidata entity records.')
+    parser.add_argument('--store', default='entities.sqlite', help='SQLite store file.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Load a JSONL file into the store.')
+    import_parser.add_argument('jsonl')
+
+    export_parser = subparsers.add_parser('export', help='Export selected attributes as a CSV.')
+    export_parser.add_argument('--attributes', nargs='+', default=['instance of'])
+    export_parser.add_argument('--output', default='entity_attributes.csv')
+
+    join_parser = subparsers.add_parser('join', help='Join a CSV with selected attributes.')
+    join_parser.add_argument('csv')
+    join_parser.add_argument('--attributes', nargs='+', default=['instance of'])
+    join_parser.add_argument('--output', default='joined_data.csv')
+
+    # Allow the --store option after the sub-command too
+    for sub in (import_parser, export_parser, join_parser):
+        sub.add_argument('--store', default=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    with EntityStore(args.store) as store:
+        if args.command == 'import':
+            print(f"Imported {store.import_jsonl(args.jsonl)} records into '{args.store}'.")
+        elif args.command == 'export':
+            exported = store.export_columns(args.attributes)
+            exported.to_csv(args.output, index=False)
+            print(f"Exported {len(exported)} entities to '{args.output}'.")
+        else:
+            store.join_csv(args.csv, args.attributes, args.output)
+            print(f"Joined '{args.csv}' into '{args.output}'.")
@@ -0,0 +1,240 @@
+"""
+Prerendered Plotly figure specs for FP_app.py.
+
+Building a figure with plotly.express (grouping the data into traces, validating every
+property) is the slowest part of rendering a page. A figure is therefore built once and
+its Plotly JSON spec is stored in figure_cache/, under a key hashed from the contents of
+the data file it was built from, the figure's parameters (e.g. the country), the plotly
+version and SPEC_VERSION. The app loads the stored spec and only applies cheap deltas such
+as the month-range filter. Regenerating a data file changes its hash, so stale specs are
+never used.
+
+Usage:
+    python figure_cache.py build                      # prerender every page's figures
+    python figure_cache.py snapshot --output app_snapshot   # static HTML export of all pages and images
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+from functools import lru_cache
+
+import plotly
+import plotly.io as pio
+
+FIGURE_CACHE_DIR = 'figure_cache'
+
+# Bump when a figure function in app_figures.py changes, so existing specs are rebuilt
+SPEC_VERSION = 1
+
+
+@lru_cache(maxsize=64)
+def _digest(path, mtime_ns, size):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of a file's contents, computed once per (path, mtime, size).
+    """
+    stat = os.stat(path)
+    return _digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+def spec_key(name, data_files, params):
+    """
+    Returns the cache key of a figure: a hash of its name, parameters and input data.
+    """
+    material = {
+        'name': name,
+        'params': params,
+        'data': [file_digest(path) for path in data_files],
+        'plotly': plotly.__version__,
+        'version': SPEC_VERSION,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class FigureCache:
+    """
+    Directory of Plotly JSON specs keyed by spec_key.
+
+    Args:
+        directory (str): Where the specs are stored (created when needed).
+    """
+
+    def __init__(self, directory=FIGURE_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.builds = 0
+
+    def path_for(self, name, key):
+        return os.path.join(self.directory, f'{name}-{key[:20]}.json')
+
+    def get_or_build(self, name, data_files, params, build):
+        """
+        Returns the JSON spec of a figure, building and storing it on a miss.
+
+        Args:
+            name (str): The figure's name (one spec file prefix per figure).
+            data_files (list[str]): The files the figure is built from.
+            params (dict): The figure's parameters (JSON-serializable).
+            build (callable): Returns the plotly Figure when the spec is not cached.
+
+        Returns:
+            str: The figure as Plotly JSON (load it with plotly.io.from_json).
+        """
+        path = self.path_for(name, spec_key(name, data_files, params))
+        try:
+            with open(path, encoding='utf-8') as f:
+                spec = f.read()
+            self.hits += 1
+            return spec
+        except FileNotFoundError:
+            pass
+
+        spec = build().to_json()
+        self.builds += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(spec)
+            os.replace(tmp_path, path) # Readers never see a partially written spec
+        except OSError:
+            pass # The cache is only an optimization (e.g. read-only deployments)
+        return spec
+
+
+def build_all():
+    """
+    Prerenders every figure of the app (page 3 once per country).
+
+    Returns:
+        int: The number of figures that had to be built (the rest were already cached).
+    """
+    import app_data
+    for name, params in app_data.all_figure_params():
+        app_data.load_figure(name, **params)
+    return app_data.FIGURE_CACHE.builds
+
+
+def _inline_html(text):
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(text))
+
+
+def _markdown_html(text):
+    """
+    Converts the small Markdown subset of the app's page text (## headings, numbered
+    lists, **bold**, paragraphs) to HTML.
+    """
+    parts = []
+    paragraph = []
+    items = []
+
+    def close_blocks():
+        if paragraph:
+            parts.append(f'<p>{_inline_html(" ".join(paragraph))}</p>')
+            paragraph.clear()
+        if items:
+            parts.append('<ol>' + ''.join(f'<li>{_inline_html(item)}</li>' for item in items) + '</ol>')
+            items.clear()
+
+    for line in text.strip().splitlines():
+        line = line.strip()
+        item = re.match(r'\d+\.\s+(.*)', line)
+        if line.startswith('## '):
+            close_blocks()
+            parts.append(f'<h2>{_inline_html(line[3:])}</h2>')
+        elif item:
+            if paragraph:
+                close_blocks()
+            items.append(item.group(1))
+        elif items:
+            items[-1] += ' ' + line # Continuation of the last list item
+        elif line:
+            paragraph.append(line)
+    close_blocks()
+    return '\n'.join(parts)
+
+
+def _page_html(title, body):
+    title = html.escape(title)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title></head>\n'
+            f'<body>\n<p><a href="index.html">All pages</a></p>\n<h1>{title}</h1>\n'
+            f'{body}\n</body></html>\n')
+
+
+def export_snapshot(output_dir):
+    """
+    Writes every page of the app as static HTML to output_dir, for serving without a
+    Python session: the main page, every figure page (page 3 once per country) with its
+    text, data snippet and confusion-matrix image, plus plotly.min.js, the images and an
+    index page.
+
+    Returns:
+        list[str]: The page files written.
+    """
+    import app_data
+    from app_pages import (ANALYSIS_OPTIONS, DATA_SNIPPET_CAPTION, FIGURE_PAGES, MAIN_PAGE,
+                           PAGE_IMAGES, PAGE_INTROS, TITLE_PREFIX)
+    os.makedirs(output_dir, exist_ok=True)
+
+    main_title = TITLE_PREFIX + ANALYSIS_OPTIONS["1"]
+    with open(os.path.join(output_dir, 'main.html'), 'w', encoding='utf-8') as f:
+        f.write(_page_html(main_title, '\n'.join(_markdown_html(block) for block in MAIN_PAGE)))
+    pages = [(main_title, 'main.html')]
+
+    for name, params in app_data.all_figure_params():
+        page = FIGURE_PAGES[name]
+        figure = app_data.load_figure(name, **params)
+        data = app_data.figure_data(name, **params)
+        header, summary, note = PAGE_INTROS[page]
+        body = [f'<h2>{html.escape(header)}</h2>', _markdown_html(summary), _markdown_html(note),
+                pio.to_html(figure, full_html=False, include_plotlyjs='directory'),
+                f'<p>{html.escape(DATA_SNIPPET_CAPTION)}</p>', data.head(10).to_html(index=False)]
+        if page in PAGE_IMAGES:
+            image, caption = PAGE_IMAGES[page]
+            image_file = app_data.IMAGES[image]
+            shutil.copyfile(os.path.join(app_data.BASE_DIR, image_file), os.path.join(output_dir, image_file))
+            body.append(f'<figure><img src="{html.escape(image_file)}" alt="{html.escape(caption)}" '
+                        f'style="max-width: 100%"><figcaption>{html.escape(caption)}</figcaption></figure>')
+
+        title = TITLE_PREFIX + ANALYSIS_OPTIONS[page] + ''.join(f' ({value})' for value in params.values())
+        filename = '-'.join([name, *(str(value) for value in params.values())]).replace(' ', '_') + '.html'
+        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(_page_html(title, '\n'.join(body)))
+        pages.append((title, filename))
+
+    # include_plotlyjs='directory' expects plotly.min.js next to the pages
+    with open(os.path.join(output_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(plotly.offline.get_plotlyjs())
+    links = '\n'.join(f'<li><a href="{filename}">{html.escape(title)}</a></li>' for title, filename in pages)
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Spanish wikipedia sport articles</title>'
+                f'</head>\n<body>\n<h1>Spanish wikipedia sport articles</h1>\n<ul>\n{links}\n</ul>\n</body></html>\n')
+    return [filename for _, filename in pages]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prerender or export FP_app.py's figures.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help='Prerender every figure spec into the figure cache.')
+    snapshot = subparsers.add_parser('snapshot', help='Export all pages as static HTML.')
+    snapshot.add_argument('--output', default='app_snapshot')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        built = build_all()
+        print(f"Built {built} figure specs (others were up to date).")
+    else:
+        written = export_snapshot(args.output)
+        print(f"Wrote {len(written)} pages and index.html to '{args.output}'.")
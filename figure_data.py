@@ -0,0 +1,75 @@
+"""
+The aggregations of 5_student_Code.ipynb that turn the labeled article tables into the
+data behind the app's figures:
+
+    figure1_finaldata.csv  share of sports articles and article count per country
+    figure2_finaldata.csv  monthly views per category
+    figure3_finaldata.csv  number of human articles per category
+
+Each is a single vectorized groupby over the labeled table, so the functions are also
+what benchmark_suite.py times.
+
+Usage:
+    python figure_data.py --figure1-labeled figure1_labeled_data.csv --figure3-labeled figure3_labeled_data.csv
+"""
+
+import argparse
+
+import pandas as pd
+
+
+def sports_share_by_country(labeled):
+    """
+    Figure 1: fraction of 'Sports' articles and number of articles per country.
+
+    Args:
+        labeled (pd.DataFrame): Rows with 'country' and 'categories_generated' columns.
+
+    Returns:
+        pd.DataFrame: Columns country, sports_percentage (0-1) and total_articles.
+    """
+    is_sports = (labeled['categories_generated'] == 'Sports').astype(int)
+    return (is_sports.groupby(labeled['country'], observed=True)
+                     .agg(sports_percentage='mean', total_articles='count')
+                     .reset_index())
+
+
+def monthly_views_by_category(labeled):
+    """
+    Figure 2: total views per month and (lowercased) category.
+
+    Args:
+        labeled (pd.DataFrame): Rows with 'date' (YYYY-MM), 'views' and 'categories_generated' columns.
+
+    Returns:
+        pd.DataFrame: Columns month (first day of the month), categories_generated and views.
+    """
+    month = pd.to_datetime(labeled['date'].astype(str).str[:7], format='%Y-%m').rename('month')
+    category = labeled['categories_generated'].astype(str).str.strip().str.lower()
+    return labeled['views'].groupby([month, category], observed=True).sum().reset_index()
+
+
+def category_counts(labeled):
+    """
+    Figure 3: number of articles per category, most frequent first.
+
+    Returns:
+        pd.DataFrame: Columns category and count.
+    """
+    counts = labeled['categories_generated'].astype(str).value_counts().reset_index()
+    counts.columns = ['category', 'count']
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the app's figure data from the labeled tables.")
+    parser.add_argument('--figure1-labeled', default='figure1_labeled_data.csv')
+    parser.add_argument('--figure3-labeled', default='figure3_labeled_data.csv')
+    args = parser.parse_args()
+
+    figure1_labeled = pd.read_csv(args.figure1_labeled)
+    sports_share_by_country(figure1_labeled).to_csv('figure1_finaldata.csv', index=False)
+    # The notebook wrote these two with their index, which the app expects
+    monthly_views_by_category(figure1_labeled).to_csv('figure2_finaldata.csv')
+    category_counts(pd.read_csv(args.figure3_labeled)).to_csv('figure3_finaldata.csv')
+    print("Wrote figure1_finaldata.csv, figure2_finaldata.csv and figure3_finaldata.csv.")
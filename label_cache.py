@@ -0,0 +1,136 @@
+"""
+Persistent cache for Wikidata labels, used by fetch_labels_for_qids in 4_get_wikidata.py.
+
+Labels are stored in a small SQLite file keyed by (id, lang), with an in-memory LRU
+in front of it so that the property and value labels shared by most entities
+(P31, P17, 'human', ...) are resolved from memory. Entries older than the TTL are
+treated as misses and fetched again.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Labels rarely change, so a month is a safe default lifetime
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+class LabelCache:
+    """
+    SQLite-backed label cache with an in-memory LRU front and TTL expiry.
+
+    A cached label of None means the entity has no label in that language,
+    which is remembered too so it is not requested over and over.
+
+    Args:
+        path (str): SQLite file to store labels in (':memory:' for a throwaway cache).
+        ttl_seconds (float): How long a stored label stays valid (None = forever).
+        memory_size (int): Maximum number of labels kept in the in-memory LRU.
+    """
+
+    def __init__(self, path="label_cache.sqlite", ttl_seconds=DEFAULT_TTL_SECONDS, memory_size=50_000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # A generous timeout lets several processes share one cache file
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS labels ("
+            " id TEXT NOT NULL, lang TEXT NOT NULL, label TEXT, fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (id, lang))"
+        )
+        self._conn.commit()
+
+    def _is_fresh(self, fetched_at, now):
+        return self.ttl_seconds is None or now - fetched_at < self.ttl_seconds
+
+    def _remember(self, key, label, fetched_at):
+        self._memory[key] = (label, fetched_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, ids, lang):
+        """
+        Looks up labels for many ids at once.
+
+        Args:
+            ids (list[str]): Wikidata Item or Property IDs.
+            lang (str): The language code of the labels.
+
+        Returns:
+            tuple: (found, missing) where found maps each cached id to its label
+                   (possibly None) and missing lists the ids that must be fetched.
+        """
+        found = {}
+        missing = []
+        now = time.time()
+
+        with self._lock:
+            to_query = []
+            for id_ in ids:
+                entry = self._memory.get((id_, lang))
+                if entry is not None and self._is_fresh(entry[1], now):
+                    self._memory.move_to_end((id_, lang))
+                    found[id_] = entry[0]
+                else:
+                    to_query.append(id_)
+
+            # SQLite limits the number of bound variables per statement
+            for start in range(0, len(to_query), 500):
+                chunk = to_query[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, label, fetched_at FROM labels WHERE lang = ? AND id IN ({','.join('?' * len(chunk))})",
+                    [lang, *chunk],
+                ).fetchall()
+                for id_, label, fetched_at in rows:
+                    if self._is_fresh(fetched_at, now):
+                        found[id_] = label
+                        self._remember((id_, lang), label, fetched_at)
+
+            missing = [id_ for id_ in to_query if id_ not in found]
+            self.hits += len(ids) - len(missing)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def put_many(self, labels, lang):
+        """
+        Stores freshly fetched labels.
+
+        Args:
+            labels (dict): Maps ids to their label, or to None when no label exists.
+            lang (str): The language code of the labels.
+        """
+        if not labels:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO labels (id, lang, label, fetched_at) VALUES (?, ?, ?, ?)",
+                [(id_, lang, label, now) for id_, label in labels.items()],
+            )
+            self._conn.commit()
+            for id_, label in labels.items():
+                self._remember((id_, lang), label, now)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counts plus the hit rate since the cache was opened.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
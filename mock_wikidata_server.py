@@ -0,0 +1,349 @@
+"""
+Local stand-in for the Wikidata wbgetentities API, for offline testing and benchmarking
+of 4_get_wikidata.py.
+
+Entities are served from a recorded fixture file (a JSON object mapping ids to the raw
+entity data returned by wbgetentities). Ids not in the fixture can be synthesized, so the
+extractor can be run against any number of QIDs. The server understands the 'ids',
+'props' and 'languages' parameters, reports missing and malformed ids the way Wikidata
+does, and can inject latency and HTTP 429 responses.
+
+Usage:
+    python mock_wikidata_server.py --port 8765 --latency 0.05 --rate-429 0.01
+    WIKIDATA_API_ENDPOINT=http://127.0.0.1:8765/w/api.php python 4_get_wikidata.py
+
+    # Record a fixture from the live API
+    python mock_wikidata_server.py --record fixture.json --qids Q83285 Q7186
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ENTITY_ID_PATTERN = re.compile(r'^[QP][1-9][0-9]*$')
+ALL_PROPS = ('info', 'claims', 'labels', 'descriptions', 'sitelinks', 'aliases')
+MAX_IDS_PER_REQUEST = 50
+
+# Labels for the properties used by synthesized entities
+PROPERTY_LABELS = {
+    'P31': 'instance of', 'P17': 'country', 'P21': 'sex or gender', 'P106': 'occupation',
+    'P569': 'date of birth', 'P1082': 'population', 'P625': 'coordinate location',
+    'P373': 'Commons category', 'P1448': 'official name', 'P279': 'subclass of',
+}
+CLASS_QIDS = ['Q5', 'Q515', 'Q11424', 'Q349', 'Q476028', 'Q16510064', 'Q7278', 'Q4830453']
+COUNTRY_QIDS = ['Q96', 'Q414', 'Q739', 'Q29', 'Q298', 'Q419', 'Q717', 'Q30']
+# A small 'subclass of' (P279) hierarchy above CLASS_QIDS, with one cycle like the real one has
+SUBCLASS_OF = {
+    'Q476028': ['Q847017'], 'Q847017': ['Q12973014', 'Q4438121'], 'Q12973014': ['Q327245'],
+    'Q4438121': ['Q43229'], 'Q327245': ['Q43229'], 'Q43229': ['Q16334295'], 'Q16334295': ['Q43229'],
+    'Q16510064': ['Q1656682'], 'Q349': ['Q1914636'], 'Q11424': ['Q2431196'], 'Q515': ['Q486972'],
+    # Occupations (P106 values of synthetic people)
+    'Q937857': ['Q2066131'], 'Q2066131': ['Q12737077'], 'Q33999': ['Q1028181'], 'Q177220': ['Q639669'],
+}
+
+
+def _entity_snak(prop, qid):
+    return {'mainsnak': {'snaktype': 'value', 'property': prop,
+                         'datavalue': {'type': 'wikibase-entityid',
+                                       'value': {'entity-type': 'item', 'id': qid}}},
+            'type': 'statement', 'rank': 'normal'}
+
+
+def _value_snak(prop, value_type, value):
+    return {'mainsnak': {'snaktype': 'value', 'property': prop,
+                         'datavalue': {'type': value_type, 'value': value}},
+            'type': 'statement', 'rank': 'normal'}
+
+
+def synthesize_entity(entity_id):
+    """
+    Builds a deterministic, realistically shaped entity for any Q or P id.
+
+    Args:
+        entity_id (str): A Wikidata Item or Property ID.
+
+    Returns:
+        dict: Raw entity data in the wbgetentities format.
+    """
+    rng = random.Random(zlib.crc32(entity_id.encode()))
+    number = int(entity_id[1:])
+
+    if entity_id.startswith('P'):
+        label = PROPERTY_LABELS.get(entity_id, f'property {entity_id}')
+        return {
+            'type': 'property', 'id': entity_id, 'datatype': 'wikibase-item',
+            'lastrevid': 1000000 + number, 'modified': '2024-01-01T00:00:00Z',
+            'labels': {'en': {'language': 'en', 'value': label}, 'es': {'language': 'es', 'value': label}},
+            'descriptions': {}, 'aliases': {}, 'claims': {},
+        }
+
+    instance_of = 'Q5' if number % 3 == 0 else rng.choice(CLASS_QIDS)
+    claims = {
+        'P31': [_entity_snak('P31', instance_of)],
+        'P17': [_entity_snak('P17', rng.choice(COUNTRY_QIDS))],
+        'P373': [_value_snak('P373', 'string', f'Category {entity_id}')],
+        'P1448': [_value_snak('P1448', 'monolingualtext', {'text': f'Official {entity_id}', 'language': 'es'})],
+    }
+    if instance_of == 'Q5':
+        claims['P21'] = [_entity_snak('P21', rng.choice(['Q6581097', 'Q6581072']))]
+        claims['P106'] = [_entity_snak('P106', rng.choice(['Q937857', 'Q33999', 'Q177220']))]
+        claims['P569'] = [_value_snak('P569', 'time', {
+            'time': f'+{rng.randint(1900, 2005)}-01-01T00:00:00Z', 'timezone': 0, 'precision': 11,
+            'calendarmodel': 'http://www.wikidata.org/entity/Q1985727'})]
+    else:
+        claims['P1082'] = [_value_snak('P1082', 'quantity', {'amount': f'+{rng.randint(1, 10**7)}', 'unit': '1'})]
+        claims['P625'] = [_value_snak('P625', 'globecoordinate', {
+            'latitude': rng.uniform(-90, 90), 'longitude': rng.uniform(-180, 180), 'precision': 0.0001,
+            'globe': 'http://www.wikidata.org/entity/Q2'})]
+    if entity_id in SUBCLASS_OF:
+        claims['P279'] = [_entity_snak('P279', parent) for parent in SUBCLASS_OF[entity_id]]
+
+    sitelinks = {f'{lang}wiki': {'site': f'{lang}wiki', 'title': f'Article {entity_id}', 'badges': []}
+                 for lang in ('en', 'es', 'fr', 'de', 'it', 'pt')[:rng.randint(1, 6)]}
+    return {
+        'type': 'item', 'id': entity_id,
+        'lastrevid': 2000000 + number, 'modified': '2024-01-01T00:00:00Z',
+        'labels': {'en': {'language': 'en', 'value': f'Entity {entity_id}'},
+                   'es': {'language': 'es', 'value': f'Entidad {entity_id}'}},
+        'descriptions': {'en': {'language': 'en', 'value': f'synthetic entity {entity_id}'},
+                         'es': {'language': 'es', 'value': f'entidad sintética {entity_id}'}},
+        'aliases': {'en': [{'language': 'en', 'value': f'Alias {entity_id}'}]},
+        'claims': claims,
+        'sitelinks': sitelinks,
+    }
+
+
+def _project_entity(entity, props, languages):
+    """
+    Keeps only the requested props (and languages) of an entity, like wbgetentities does.
+    """
+    projected = {key: entity[key] for key in ('type', 'id') if key in entity}
+    if 'redirects' in entity:
+        projected['redirects'] = entity['redirects']
+    if 'info' in props:
+        for key in ('pageid', 'ns', 'title', 'lastrevid', 'modified'):
+            if key in entity:
+                projected[key] = entity[key]
+    for prop in ('labels', 'descriptions', 'aliases'):
+        if prop in props:
+            values = entity.get(prop, {})
+            projected[prop] = {lang: v for lang, v in values.items() if languages is None or lang in languages}
+    for prop in ('claims', 'sitelinks'):
+        if prop in props:
+            projected[prop] = entity.get(prop, {})
+    return projected
+
+
+class MockWikidataServer:
+    """
+    Threaded local HTTP server answering wbgetentities requests.
+
+    Args:
+        fixture (dict): Maps entity ids to raw entity data (None for none).
+        synthesize_missing (bool): Synthesize entities not in the fixture; when False they are 'missing'.
+        missing_ids (set): Ids always reported as missing (deleted entities).
+        latency (float): Seconds added to every response.
+        latency_jitter (float): Extra random latency, uniform in [0, latency_jitter].
+        rate_429 (float): Probability of answering with HTTP 429 and a Retry-After header.
+        retry_after (float): Value of the Retry-After header sent with 429 responses.
+        host (str): Interface to listen on.
+        port (int): Port to listen on (0 picks a free port).
+    """
+
+    def __init__(self, fixture=None, synthesize_missing=True, missing_ids=None, latency=0.0,
+                 latency_jitter=0.0, rate_429=0.0, retry_after=0, host='127.0.0.1', port=0):
+        self.fixture = fixture or {}
+        self.synthesize_missing = synthesize_missing
+        self.missing_ids = set(missing_ids or ())
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.entity_count = 0
+        self.throttled_count = 0
+        self._stats_lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/w/api.php'
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.request_count = 0
+            self.entity_count = 0
+            self.throttled_count = 0
+
+    def _lookup(self, entity_id):
+        if entity_id in self.missing_ids:
+            return None
+        if entity_id in self.fixture:
+            return self.fixture[entity_id]
+        if self.synthesize_missing:
+            return synthesize_entity(entity_id)
+        return None
+
+    def handle_query(self, query):
+        """
+        Answers one API query.
+
+        Args:
+            query (dict): Query parameters mapped to their (single) string values.
+
+        Returns:
+            tuple: (HTTP status, headers dict, JSON-serializable body).
+        """
+        with self._stats_lock:
+            self.request_count += 1
+            throttle = self._rng.random() < self.rate_429
+            if throttle:
+                self.throttled_count += 1
+
+        delay = self.latency + (self._rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if throttle:
+            return 429, {'Retry-After': str(self.retry_after)}, {
+                'error': {'code': 'ratelimited', 'info': 'You have exceeded your rate limit.'}}
+
+        if query.get('action') != 'wbgetentities':
+            return 200, {}, {'error': {'code': 'badvalue', 'info': f"Unrecognized value for parameter \"action\": {query.get('action')}."}}
+
+        ids = [i for i in query.get('ids', '').split('|') if i]
+        if not ids:
+            return 200, {}, {'error': {'code': 'param-missing', 'info': 'Either provide the item "ids" or pairs of "sites" and "titles".'}}
+        if len(ids) > MAX_IDS_PER_REQUEST:
+            return 200, {}, {'error': {'code': 'toomanyvalues', 'info': f'Too many values supplied for parameter "ids". The limit is {MAX_IDS_PER_REQUEST}.'}}
+        for entity_id in ids:
+            if not ENTITY_ID_PATTERN.match(entity_id):
+                return 200, {}, {'error': {'code': 'no-such-entity', 'info': f'Could not find an entity with the ID "{entity_id}".', 'id': entity_id}}
+
+        props = set(query.get('props', 'info|sitelinks|aliases|labels|descriptions|claims|datatype').split('|'))
+        languages = set(query['languages'].split('|')) if query.get('languages') else None
+
+        entities = {}
+        for entity_id in ids:
+            entity = self._lookup(entity_id)
+            if entity is None:
+                entities[entity_id] = {'id': entity_id, 'missing': ''}
+            else:
+                entities[entity_id] = _project_entity(entity, props, languages)
+
+        with self._stats_lock:
+            self.entity_count += len(ids)
+        return 200, {}, {'entities': entities, 'success': 1}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                status, headers, body = server.handle_query(query)
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output readable
+
+        return Handler
+
+    def start(self):
+        """
+        Starts serving in a background thread and returns the server.
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_fixture(path):
+    """
+    Loads a recorded fixture file (id -> raw entity data).
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record_fixture(entity_ids, path, endpoint='https://www.wikidata.org/w/api.php'):
+    """
+    Fetches full entity data for entity_ids from the live API and saves it as a fixture file.
+
+    Args:
+        entity_ids (list[str]): Item or Property IDs to record.
+        path (str): Where to write the fixture JSON.
+        endpoint (str): The API to record from.
+    """
+    from wikidata_client import WikidataClient
+
+    client = WikidataClient()
+    fixture = {}
+    for start in range(0, len(entity_ids), MAX_IDS_PER_REQUEST):
+        chunk = entity_ids[start:start + MAX_IDS_PER_REQUEST]
+        data = client.get(endpoint, {
+            'action': 'wbgetentities', 'ids': '|'.join(chunk), 'format': 'json',
+            'props': 'info|claims|labels|descriptions|sitelinks|aliases',
+        }, timeout=30)
+        if 'error' in data:
+            raise RuntimeError(f"API Error while recording {chunk}: {data['error']['info']}")
+        fixture.update({entity_id: entity for entity_id, entity in data['entities'].items() if 'missing' not in entity})
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(fixture, f, ensure_ascii=False)
+    print(f"Recorded {len(fixture)} entities to '{path}'.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Wikidata wbgetentities API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixture', help='Recorded fixture JSON to serve entities from.')
+    parser.add_argument('--no-synthesize', action='store_true', help='Report ids missing from the fixture as missing.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response.')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Extra random latency in seconds.')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered with HTTP 429.')
+    parser.add_argument('--record', metavar='PATH', help='Record a fixture from the live API instead of serving.')
+    parser.add_argument('--qids', nargs='*', default=[], help='Ids to record (with --record).')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.qids, args.record)
+    else:
+        server = MockWikidataServer(
+            fixture=load_fixture(args.fixture) if args.fixture else None,
+            synthesize_missing=not args.no_synthesize, latency=args.latency,
+            latency_jitter=args.latency_jitter, rate_429=args.rate_429,
+            host=args.host, port=args.port)
+        print(f"Serving mock Wikidata API at {server.url}")
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,279 @@
+"""
+Instrumentation for the Wikidata extraction pipeline in 4_get_wikidata.py.
+
+PipelineMetrics collects per-stage timings (as latency histograms), API request counts,
+response bytes, retries and record errors by category. It can be written at any time as
+JSON and as a Prometheus text-format file (for the node_exporter textfile collector or
+any scraper that reads files). Stage timers are exclusive: time spent in a nested stage
+(e.g. a value-label fetch inside extraction) is only counted for the nested stage.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGES = ('entity_fetch', 'property_label_fetch', 'value_label_fetch', 'extraction', 'statement_flatten',
+          'category_rollup', 'write')
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style (not thread-safe on its own).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_seconds': self.sum,
+            'mean_seconds': self.sum / self.count if self.count else None,
+            'buckets': {str(bound): cumulative for bound, cumulative in zip(self.buckets, self.cumulative_counts())},
+        }
+
+
+def classify_error(message):
+    """
+    Maps an error message from the fetch functions to a short error category.
+    """
+    message = (message or '').lower()
+    if 'network' in message:
+        return 'network'
+    if 'missing' in message or 'not found' in message:
+        return 'missing'
+    if 'decode' in message:
+        return 'decode'
+    if 'api error' in message:
+        return 'api'
+    if 'unexpected' in message:
+        return 'unexpected'
+    return 'other'
+
+
+class PipelineMetrics:
+    """
+    Thread-safe metrics registry for one pipeline run.
+
+    Args:
+        prefix (str): Output path prefix; write() creates '<prefix>.json' and '<prefix>.prom'.
+        emit_every_seconds (float): Minimum time between periodic writes by maybe_write().
+    """
+
+    def __init__(self, prefix="pipeline_metrics", emit_every_seconds=60):
+        self.prefix = prefix
+        self.emit_every_seconds = emit_every_seconds
+        self.started_at = time.time()
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.request_latency = Histogram()
+        self.requests = 0
+        self.response_bytes = 0
+        self.retries = {}
+        self.errors = {}
+        self.records = {'success': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_write = time.monotonic()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a block as one observation of a pipeline stage (exclusive of nested stages).
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0] # Time spent in nested stages
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                histogram = self.stages.get(name)
+                if histogram is None:
+                    histogram = self.stages[name] = Histogram()
+                histogram.observe(elapsed - frame[0])
+
+    def observe_request(self, seconds, response_bytes):
+        with self._lock:
+            self.requests += 1
+            self.response_bytes += response_bytes
+            self.request_latency.observe(seconds)
+
+    def count_retry(self, reason):
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def count_record(self, record):
+        with self._lock:
+            self.records[record['status']] = self.records.get(record['status'], 0) + 1
+            if record['status'] != 'success':
+                category = classify_error(record.get('error_message'))
+                self.errors[category] = self.errors.get(category, 0) + 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: All metrics as JSON-serializable data.
+        """
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            processed = sum(self.records.values())
+            return {
+                'timestamp': time.time(),
+                'elapsed_seconds': elapsed,
+                'records': dict(self.records),
+                'entities_per_second': processed / elapsed if elapsed else None,
+                'requests': self.requests,
+                'response_bytes': self.response_bytes,
+                'requests_per_entity': self.requests / processed if processed else None,
+                'retries': dict(self.retries),
+                'errors': dict(self.errors),
+                'request_latency': self.request_latency.to_dict(),
+                'stages': {name: histogram.to_dict() for name, histogram in self.stages.items()},
+            }
+
+    def to_prometheus(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        def histogram_lines(name, histogram, labels=''):
+            sep = ',' if labels else ''
+            for bound, cumulative in zip(histogram.buckets, histogram.cumulative_counts()):
+                yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}'
+            yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {histogram.count}'
+            suffix = f'{{{labels}}}' if labels else ''
+            yield f'{name}_sum{suffix} {histogram.sum}'
+            yield f'{name}_count{suffix} {histogram.count}'
+
+        with self._lock:
+            lines = [
+                '# HELP wikidata_records_total Records written, by status.',
+                '# TYPE wikidata_records_total counter',
+                *(f'wikidata_records_total{{status="{status}"}} {count}' for status, count in self.records.items()),
+                '# HELP wikidata_requests_total API requests sent.',
+                '# TYPE wikidata_requests_total counter',
+                f'wikidata_requests_total {self.requests}',
+                '# HELP wikidata_response_bytes_total Bytes received from the API.',
+                '# TYPE wikidata_response_bytes_total counter',
+                f'wikidata_response_bytes_total {self.response_bytes}',
+                '# HELP wikidata_retries_total Retried API requests, by reason.',
+                '# TYPE wikidata_retries_total counter',
+                *(f'wikidata_retries_total{{reason="{reason}"}} {count}' for reason, count in self.retries.items()),
+                '# HELP wikidata_errors_total Failed records, by error category.',
+                '# TYPE wikidata_errors_total counter',
+                *(f'wikidata_errors_total{{category="{category}"}} {count}' for category, count in self.errors.items()),
+                '# HELP wikidata_request_seconds Latency of single API requests.',
+                '# TYPE wikidata_request_seconds histogram',
+                *histogram_lines('wikidata_request_seconds', self.request_latency),
+                '# HELP wikidata_stage_seconds Time spent per pipeline stage (exclusive of nested stages).',
+                '# TYPE wikidata_stage_seconds histogram',
+            ]
+            for name, histogram in self.stages.items():
+                lines.extend(histogram_lines('wikidata_stage_seconds', histogram, f'stage="{name}"'))
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """
+        Writes '<prefix>.json' and '<prefix>.prom', replacing the previous files atomically.
+        """
+        for path, content in ((self.prefix + '.json', json.dumps(self.snapshot(), indent=2)),
+                              (self.prefix + '.prom', self.to_prometheus())):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        self._last_write = time.monotonic()
+
+    def maybe_write(self):
+        """
+        Writes the metrics files if emit_every_seconds have passed since the last write.
+        """
+        if time.monotonic() - self._last_write >= self.emit_every_seconds:
+            self.write()
+
+
+class SampledProfiler:
+    """
+    Runs cProfile on every Nth call of profile() and accumulates the statistics.
+
+    Args:
+        every (int): Profile one call out of this many.
+        output_path (str): Where save() writes the combined pstats file.
+    """
+
+    def __init__(self, every=100, output_path="pipeline_profile.pstats"):
+        self.every = every
+        self.output_path = output_path
+        self.calls = 0
+        self.profiled = 0
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def profile(self, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs), under the profiler if this call is sampled.
+        """
+        with self._lock:
+            self.calls += 1
+            sampled = self.calls % self.every == 0
+        if not sampled:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on newer Pythons
+            return func(*args, **kwargs)
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.create_stats()
+            with self._lock:
+                self.profiled += 1
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def save(self):
+        """
+        Writes the combined statistics (readable with python -m pstats) if anything was profiled.
+        """
+        with self._lock:
+            if self._stats is not None:
+                self._stats.dump_stats(self.output_path)
+                return True
+        return False
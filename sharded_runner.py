@@ -0,0 +1,196 @@
+"""
+Runs process_qids_to_jsonl over a large QID list in several worker processes.
+
+The QID list is hash-partitioned into N shards (the same QID always lands in the same
+shard, so re-runs resume shard by shard). Each shard runs in its own process and writes
+its own '<output>.shard-<i>.jsonl'. All processes draw from one SharedTokenBucket, so the
+total request rate stays within --max-rps. A final merge step writes one deduplicated,
+QID-ordered output file, restricted to the QIDs of the input list, and a combined
+statistics file. --fresh discards the shard files of earlier runs instead of resuming them.
+
+Usage:
+    python sharded_runner.py --input 2024_2023_wikiSpanish_qid.csv --output entity_results.jsonl \\
+        --shards 4 --workers-per-shard 4 --max-rps 10 [--fresh]
+    python sharded_runner.py --output entity_results.jsonl --shards 4 --merge-only
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import zlib
+
+from wikidata_client import SharedTokenBucket
+from wikidata_loader import load_get_wikidata
+
+
+def shard_of(qid, shards):
+    """
+    Returns the shard index (0..shards-1) of a QID, stable across runs and machines.
+    """
+    return zlib.crc32(qid.encode('utf-8')) % shards
+
+
+def partition_qids(qid_list, shards):
+    """
+    Splits a QID list into shards, dropping duplicates and keeping input order within a shard.
+    """
+    partitions = [[] for _ in range(shards)]
+    for qid in dict.fromkeys(qid_list):
+        partitions[shard_of(qid, shards)].append(qid)
+    return partitions
+
+
+def shard_path(output_filename, shard):
+    base, ext = os.path.splitext(output_filename)
+    return f"{base}.shard-{shard}{ext or '.jsonl'}"
+
+
+def _run_shard(shard, qids, output_filename, rate_limiter, workers, label_cache_path, projection_name, resume):
+    """
+    Worker process entry point: processes one shard, logging to '<shard file>.log'.
+    """
+    get_wikidata = load_get_wikidata()
+    path = shard_path(output_filename, shard)
+    projection = getattr(get_wikidata, projection_name) if projection_name else None
+
+    with open(path + '.log', 'a' if resume else 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        get_wikidata.process_qids_to_jsonl(
+            qids, path, workers=workers, label_cache_path=label_cache_path, resume=resume,
+            projection=projection, metrics_prefix=path + '.metrics', rate_limiter=rate_limiter)
+
+
+def _qid_sort_key(qid):
+    return (qid[:1], int(qid[1:])) if qid[1:].isdigit() else (qid[:1], float('inf'), qid)
+
+
+def merge_shards(output_filename, shards, qids=None):
+    """
+    Merges the shard files into one QID-ordered output with one record per QID
+    (a later record for the same QID replaces an earlier one), and combines the
+    shards' statistics into '<output>.stats.json'.
+
+    Args:
+        output_filename (str): The merged JSONL output file.
+        shards (int): Number of shard files.
+        qids (set): Only merge the records of these QIDs, leaving out those that
+                    earlier runs with another input list left in the shard files
+                    (None = merge every record).
+
+    Returns:
+        dict: The combined statistics.
+    """
+    records = {}
+    stats = {'shards': shards, 'records': {}, 'requests': 0, 'response_bytes': 0, 'retries': {}, 'errors': {}}
+
+    for shard in range(shards):
+        path = shard_path(output_filename, shard)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue # Partially written line of an interrupted shard
+                    if qids is None or record["QID"] in qids:
+                        records[record["QID"]] = record
+
+        metrics_path = path + '.metrics.json'
+        if os.path.exists(metrics_path):
+            with open(metrics_path, encoding='utf-8') as f:
+                shard_metrics = json.load(f)
+            stats['requests'] += shard_metrics['requests']
+            stats['response_bytes'] += shard_metrics['response_bytes']
+            for key in ('retries', 'errors'):
+                for name, count in shard_metrics[key].items():
+                    stats[key][name] = stats[key].get(name, 0) + count
+
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for qid in sorted(records, key=_qid_sort_key):
+            record = records[qid]
+            stats['records'][record['status']] = stats['records'].get(record['status'], 0) + 1
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    stats['total'] = len(records)
+    with open(os.path.splitext(output_filename)[0] + '.stats.json', 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def run_sharded(qid_list, output_filename="entity_results.jsonl", shards=4, workers_per_shard=4,
+                max_requests_per_second=10, label_cache_path="label_cache.sqlite", projection_name=None,
+                resume=True):
+    """
+    Processes qid_list in `shards` worker processes and merges their output.
+
+    Args:
+        qid_list (list): A list of QID strings.
+        output_filename (str): The merged JSONL output file.
+        shards (int): Number of worker processes.
+        workers_per_shard (int): Worker threads inside each process.
+        max_requests_per_second (float): Total API request limit across all processes.
+        label_cache_path (str): SQLite label cache shared by the processes (None disables caching).
+        projection_name (str): Name of a projection in 4_get_wikidata.py (e.g. 'LEAN_PROJECTION').
+        resume (bool): Skip the QIDs already stored in the shard files (False = start
+                       every shard file over).
+
+    Returns:
+        dict: The combined statistics from merge_shards.
+    """
+    partitions = partition_qids(qid_list, shards)
+    rate_limiter = SharedTokenBucket(max_requests_per_second) if max_requests_per_second else None
+
+    print(f"Processing {sum(map(len, partitions))} QIDs in {shards} shards "
+          f"({', '.join(str(len(p)) for p in partitions)} QIDs).")
+
+    processes = []
+    for shard, qids in enumerate(partitions):
+        process = multiprocessing.Process(
+            target=_run_shard, name=f"shard-{shard}",
+            args=(shard, qids, output_filename, rate_limiter, workers_per_shard, label_cache_path, projection_name,
+                  resume))
+        process.start()
+        processes.append(process)
+
+    failed_shards = []
+    for shard, process in enumerate(processes):
+        process.join()
+        if process.exitcode != 0:
+            failed_shards.append(shard)
+    if failed_shards:
+        print(f"Warning: shards {failed_shards} exited with errors; see their .log files. "
+              "Re-running resumes them.")
+
+    stats = merge_shards(output_filename, shards, {qid for partition in partitions for qid in partition})
+    print("\n--- Processing Complete ---")
+    print(f"Total Records: {stats['total']}")
+    print(f"Successful Records: {stats['records'].get('success', 0)}")
+    print(f"Failed Records: {stats['records'].get('failed', 0)}")
+    print(f"API Requests: {stats['requests']}")
+    print("---------------------------\n")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Wikidata extractor in several processes.')
+    parser.add_argument('--input', default='2024_2023_wikiSpanish_qid.csv', help="CSV with a 'qid' column.")
+    parser.add_argument('--output', default='entity_results.jsonl')
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--workers-per-shard', type=int, default=4)
+    parser.add_argument('--max-rps', type=float, default=10, help='Total requests per second across all shards.')
+    parser.add_argument('--label-cache', default='label_cache.sqlite', help="Label cache file ('' disables it).")
+    parser.add_argument('--lean', action='store_true', help='Fetch with LEAN_PROJECTION.')
+    parser.add_argument('--merge-only', action='store_true', help='Only merge existing shard files.')
+    parser.add_argument('--fresh', action='store_true', help='Start the shard files over instead of resuming them.')
+    args = parser.parse_args()
+
+    if args.merge_only:
+        merged = merge_shards(args.output, args.shards)
+        print(f"Merged {merged['total']} records into '{args.output}'.")
+    else:
+        import pandas as pd
+        qids = pd.read_csv(args.input)['qid'].dropna().tolist()
+        run_sharded(qids, args.output, shards=args.shards, workers_per_shard=args.workers_per_shard,
+                    max_requests_per_second=args.max_rps, label_cache_path=args.label_cache or None,
+                    projection_name='LEAN_PROJECTION' if args.lean else None, resume=not args.fresh)
@@ -0,0 +1,440 @@
+"""
+Long, typed columnar layout for Wikidata statements.
+
+extract_labeled_claim_values in 4_get_wikidata.py keeps one value per property, keyed
+by its label. This module keeps every statement instead: one row per (entity, statement)
+with its rank, a typed value (entity id, amount + unit, time + precision, coordinates or
+text) and its qualifiers, written to Parquet or Arrow IPC in row-group batches.
+
+A statement directory holds the part-files of every run ('part-<time>-<pid>-<id>.parquet'),
+so a resumed run adds its statements next to those of the earlier runs instead of replacing
+them. A part is written under a '.tmp' name and only renamed once it is complete, so a
+crashed run never leaves a half-written part behind. Filtering by property or value is a
+columnar scan over all of the memory-mapped parts:
+
+    table = read_statements('statements', columns=['qid', 'value_id'],
+                            filters=[('pid', '=', 'P31'), ('value_id', '=', 'Q5')])
+
+Usage:
+    python statement_table.py from-raw entity_data.jsonl.raw statements
+    python statement_table.py query statements --pid P31 --value Q5
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Typed value of a main snak or a qualifier; only the fields of its value_type are set
+VALUE_FIELDS = [
+    pa.field('value_type', pa.string()),
+    pa.field('value_id', pa.string()),
+    pa.field('value_text', pa.string()),
+    pa.field('language', pa.string()),
+    pa.field('amount', pa.float64()),
+    pa.field('unit', pa.string()),
+    pa.field('time', pa.string()),
+    pa.field('precision', pa.int8()),
+    pa.field('latitude', pa.float64()),
+    pa.field('longitude', pa.float64()),
+]
+
+QUALIFIER_TYPE = pa.struct([pa.field('pid', pa.string()), *VALUE_FIELDS])
+
+SCHEMA = pa.schema([
+    pa.field('qid', pa.string()),
+    pa.field('pid', pa.string()),
+    pa.field('statement_id', pa.string()),
+    pa.field('rank', pa.string()),
+    pa.field('snaktype', pa.string()),
+    *VALUE_FIELDS,
+    pa.field('qualifiers', pa.list_(QUALIFIER_TYPE)),
+])
+
+DEFAULT_ROW_GROUP_SIZE = 100_000
+
+WIKIDATA_ENTITY_PREFIX = 'http://www.wikidata.org/entity/'
+
+# Statement file format -> part-file extension
+PART_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def snak_value(snak):
+    """
+    Decodes a snak into the typed fields of VALUE_FIELDS.
+
+    Args:
+        snak (dict): A main snak or qualifier snak from the wbgetentities JSON.
+
+    Returns:
+        dict: value_type and the fields for that type (None for 'novalue'/'somevalue' snaks).
+    """
+    data_value = snak.get('datavalue')
+    if data_value is None:
+        return {'value_type': None}
+
+    value_type = data_value.get('type')
+    value = data_value.get('value')
+    fields = {'value_type': value_type}
+    if value_type == 'wikibase-entityid':
+        fields['value_id'] = value['id']
+    elif value_type == 'string':
+        fields['value_text'] = value
+    elif value_type == 'monolingualtext':
+        fields['value_text'] = value['text']
+        fields['language'] = value['language']
+    elif value_type == 'quantity':
+        fields['amount'] = float(value['amount'])
+        unit = value.get('unit', '1')
+        fields['unit'] = None if unit == '1' else unit.replace(WIKIDATA_ENTITY_PREFIX, '')
+    elif value_type == 'time':
+        fields['time'] = value['time']
+        fields['precision'] = value.get('precision')
+    elif value_type == 'globecoordinate':
+        fields['latitude'] = value['latitude']
+        fields['longitude'] = value['longitude']
+    else:
+        fields['value_text'] = json.dumps(value, ensure_ascii=False)
+    return fields
+
+
+def statement_rows(qid, entity_data):
+    """
+    Yields one row (a dict matching SCHEMA) per statement of an entity, for every
+    property and every rank, including deprecated statements.
+
+    Args:
+        qid (str): The entity's QID.
+        entity_data (dict): Raw entity data as returned by the fetch functions.
+    """
+    for pid, statements in entity_data.get('claims', {}).items():
+        for statement in statements:
+            main_snak = statement.get('mainsnak', {})
+            qualifiers = [
+                {'pid': qualifier_pid, **snak_value(snak)}
+                for qualifier_pid in statement.get('qualifiers-order', statement.get('qualifiers', {}))
+                for snak in statement.get('qualifiers', {}).get(qualifier_pid, [])
+            ]
+            yield {
+                'qid': qid,
+                'pid': pid,
+                'statement_id': statement.get('id'),
+                'rank': statement.get('rank'),
+                'snaktype': main_snak.get('snaktype'),
+                **snak_value(main_snak),
+                'qualifiers': qualifiers,
+            }
+
+
+class StatementWriter:
+    """
+    Buffers statement rows and writes them as row groups to a Parquet or Arrow IPC file.
+    The file is written as '<path>.tmp' and renamed to path by close().
+
+    Args:
+        path (str): Output file.
+        format (str): 'parquet' or 'arrow' (Arrow IPC file, which can be memory-mapped as is).
+        row_group_size (int): Rows per written row group / record batch.
+    """
+
+    def __init__(self, path, format='parquet', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        if format not in ('parquet', 'arrow'):
+            raise ValueError("format must be 'parquet' or 'arrow'")
+        self.path = path
+        self.format = format
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._rows = []
+        self._tmp_path = path + '.tmp'
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(self._tmp_path, SCHEMA, compression='zstd')
+        else:
+            self._sink = pa.OSFile(self._tmp_path, 'wb')
+            self._writer = ipc.new_file(self._sink, SCHEMA)
+
+    def write_entity(self, qid, entity_data):
+        """
+        Adds every statement of one entity (entities carrying an 'error' are skipped).
+        """
+        if 'error' not in entity_data:
+            self.write_rows(statement_rows(qid, entity_data))
+
+    def write_rows(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows as one row group.
+        """
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        self.write_table(pa.Table.from_pylist(rows, schema=SCHEMA))
+
+    def write_table(self, table):
+        """
+        Writes a pyarrow Table with SCHEMA (after any buffered rows).
+        """
+        self.flush()
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows_written += table.num_rows
+
+    def close(self):
+        """
+        Writes the remaining rows and the file footer, then moves the file to its final path.
+        """
+        self.flush()
+        self._writer.close()
+        if self.format == 'arrow':
+            self._sink.close()
+        with open(self._tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PartWriter:
+    """
+    Writes statement rows to new part-files of a statement directory. checkpoint()
+    closes the current part, so every row written so far is in a complete, readable
+    file; the next rows start a new part. Parts without rows are never created.
+
+    Args:
+        directory (str): The statement directory (created if needed).
+        format (str): 'parquet' or 'arrow'.
+        row_group_size (int): Rows per written row group / record batch.
+    """
+
+    def __init__(self, directory, format='parquet', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        if format not in PART_EXTENSIONS:
+            raise ValueError("format must be 'parquet' or 'arrow'")
+        self.directory = directory
+        self.format = format
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self.parts = []
+        self._writer = None
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = StatementWriter(new_part_path(self.directory, self.format), self.format,
+                                           self.row_group_size)
+        self._writer.write_rows(rows)
+
+    def checkpoint(self):
+        """
+        Closes the current part-file (if any rows were written to it).
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        self.rows_written += self._writer.rows_written
+        self.parts.append(self._writer.path)
+        self._writer = None
+
+    def close(self):
+        self.checkpoint()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def new_part_path(directory, format='parquet'):
+    """
+    Returns the path of a new part-file in a statement directory (created if needed).
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    return os.path.join(directory, name + PART_EXTENSIONS[format])
+
+
+def part_files(directory):
+    """
+    Returns the part-files of a statement directory, oldest first ('.tmp' parts that are
+    still being written, or were left by a crashed run, are not included).
+    """
+    return sorted(path for extension in PART_EXTENSIONS.values()
+                  for path in glob.glob(os.path.join(directory, f'part-*{extension}')))
+
+
+def _is_complete(path):
+    """
+    True if a statement file has its footer (a Parquet or Arrow IPC file cut short by a
+    crash cannot be read at all).
+    """
+    try:
+        if path.endswith('.parquet'):
+            pq.read_metadata(path)
+        else:
+            ipc.open_file(pa.memory_map(path, 'r'))
+        return True
+    except (pa.ArrowException, OSError):
+        return False
+
+
+def complete_parts(directory):
+    """
+    Returns the readable part-files of a statement directory, skipping (with a message)
+    incomplete ones.
+    """
+    parts = []
+    for path in part_files(directory):
+        if _is_complete(path):
+            parts.append(path)
+        else:
+            print(f"Skipping incomplete statement part '{path}'.")
+    return parts
+
+
+def clear_parts(directory):
+    """
+    Deletes the part-files of a statement directory (before a fresh, non-resumed run),
+    including unfinished '.tmp' parts.
+    """
+    for path in part_files(directory) + glob.glob(os.path.join(directory, 'part-*.tmp')):
+        os.remove(path)
+
+
+def move_parts(source, directory):
+    """
+    Moves the part-files of the statement directory source into directory and
+    deletes source.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for path in part_files(source):
+        os.replace(path, os.path.join(directory, os.path.basename(path)))
+    shutil.rmtree(source)
+
+
+def _read_part(path):
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    return ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def retain_qids(directory, qids):
+    """
+    Removes the statements of every entity not in qids from a statement directory,
+    rewriting only the part-files that hold such statements.
+
+    Args:
+        directory (str): The statement directory.
+        qids (iterable): The QIDs whose statements are kept.
+
+    Returns:
+        int: The number of statement rows removed.
+    """
+    keep = pa.array(list(set(qids)), pa.string())
+    removed = 0
+    for path in complete_parts(directory):
+        table = _read_part(path)
+        mask = pc.is_in(table['qid'], value_set=keep)
+        kept_rows = pc.sum(mask).as_py() or 0
+        if kept_rows == table.num_rows:
+            continue
+        if kept_rows:
+            format = 'parquet' if path.endswith('.parquet') else 'arrow'
+            with StatementWriter(new_part_path(directory, format), format) as writer:
+                writer.write_table(table.filter(mask))
+        os.remove(path)
+        removed += table.num_rows - kept_rows
+    return removed
+
+
+def read_statements(path, columns=None, filters=None):
+    """
+    Reads statements written by StatementWriter, memory-mapped.
+
+    Args:
+        path (str): A statement directory (all of its part-files are read as one table),
+                    a '.parquet' file, or an Arrow IPC file ('.arrow'/'.feather').
+        columns (list[str]): Columns to load (None = all).
+        filters (list[tuple]): Row filters such as [('pid', '=', 'P31')]. For Parquet they
+                               are pushed down so non-matching row groups are skipped.
+
+    Returns:
+        pyarrow.Table: The matching statements.
+    """
+    files = complete_parts(path) if os.path.isdir(path) else [path]
+    if not files:
+        table = SCHEMA.empty_table()
+        return table.select(columns) if columns else table
+
+    formats = {'parquet' if file.endswith('.parquet') else 'ipc' for file in files}
+    if len(formats) > 1:
+        raise ValueError(f"'{path}' mixes Parquet and Arrow part-files")
+    dataset = ds.dataset(files, schema=SCHEMA, format=formats.pop(),
+                         filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=columns, filter=pq.filters_to_expression(filters) if filters else None)
+
+
+def raw_file_to_statements(raw_filename, directory, format='parquet', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """
+    Converts the raw entity file of process_qids_two_phase ('<output>.raw') to a new
+    part-file of a statement directory.
+
+    Returns:
+        int: The number of statement rows written.
+    """
+    with StatementWriter(new_part_path(directory, format), format, row_group_size) as writer, \
+            open(raw_filename, encoding='utf-8') as f:
+        for line in f:
+            raw = json.loads(line)
+            writer.write_entity(raw["QID"], raw["entity"])
+    return writer.rows_written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build and query columnar Wikidata statement files.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    from_raw = subparsers.add_parser('from-raw', help='Convert a two-phase raw file to a statement part-file.')
+    from_raw.add_argument('raw', help="Raw entity file written by process_qids_two_phase.")
+    from_raw.add_argument('output', help="Statement directory to add the part-file to.")
+    from_raw.add_argument('--format', choices=sorted(PART_EXTENSIONS), default='parquet')
+    from_raw.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE)
+
+    query = subparsers.add_parser('query', help='Print the statements of one property.')
+    query.add_argument('path', help='Statement directory or single statement file.')
+    query.add_argument('--pid', required=True)
+    query.add_argument('--value', help='Only statements whose entity value is this QID.')
+    query.add_argument('--output', help='Write the matches to this CSV instead of printing them.')
+
+    args = parser.parse_args()
+    if args.command == 'from-raw':
+        rows = raw_file_to_statements(args.raw, args.output, args.format, args.row_group_size)
+        print(f"Wrote {rows} statements to '{args.output}'.")
+    else:
+        filters = [('pid', '=', args.pid)] + ([('value_id', '=', args.value)] if args.value else [])
+        matches = read_statements(args.path, filters=filters).drop_columns(['qualifiers']).to_pandas()
+        if args.output:
+            matches.to_csv(args.output, index=False)
+            print(f"Wrote {len(matches)} statements to '{args.output}'.")
+        else:
+            print(matches.to_string(index=False))
@@ -0,0 +1,103 @@
+"""
+Streaming top-N-per-month extraction from the raw pageview dump (wiki_spanish.csv).
+
+The notebook loads the whole tab-separated dump into pandas, truncates every date with a
+per-row apply and fully sorts each month to keep its 400 most viewed articles. Here the
+dump is read in chunks and only a fixed-size min-heap of the best rows per month (or per
+month and country) is kept, so memory stays bounded by the number of groups times N no
+matter how large the dump is. The result is the top rows and the deduplicated QID list
+that process_qids_to_jsonl in 4_get_wikidata.py takes as input.
+
+Usage:
+    python top_pageviews.py wiki_spanish.csv --top 400 --qids-output 2024_2023_wikiSpanish_qid.csv
+    python top_pageviews.py wiki_spanish.csv --top 100 --per-country --rows-output top_rows.csv \\
+        --fetch entity_results.jsonl
+"""
+
+import argparse
+import heapq
+from itertools import count
+
+import pandas as pd
+
+# The dump has no header row
+COLUMNS = ['date', 'country', 'contry_code', 'project', 'id', 'title', 'qid', 'views']
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def top_n_per_month(path, n=400, per_country=False, chunksize=DEFAULT_CHUNKSIZE, sep='\t'):
+    """
+    Finds the n most viewed rows of every month (or of every month and country) in one pass.
+
+    Args:
+        path (str): The pageview dump (plain, or compressed with a .gz/.bz2/.zip/.xz suffix).
+        n (int): Rows kept per group.
+        per_country (bool): Group by month and country instead of by month only.
+        chunksize (int): Rows read at a time.
+        sep (str): Field separator of the dump.
+
+    Returns:
+        pd.DataFrame: The top rows with 'date' truncated to the month ('YYYY-MM'), sorted by
+                      group and then by views, highest first. Rows with equal views keep
+                      their dump order.
+    """
+    keys = ['date', 'country'] if per_country else ['date']
+    heaps = {}
+    sequence = count() # Tie-breaker: among equal views the earlier row wins
+
+    reader = pd.read_csv(path, sep=sep, header=None, names=COLUMNS, chunksize=chunksize,
+                         dtype={column: str for column in COLUMNS if column != 'views'})
+    for chunk in reader:
+        chunk['date'] = chunk['date'].str[:7]
+        chunk['views'] = pd.to_numeric(chunk['views'], errors='coerce').fillna(0).astype('int64')
+        # Only the n best rows of each group in this chunk can enter the heaps
+        candidates = chunk.sort_values('views', ascending=False, kind='stable').groupby(keys, sort=False).head(n)
+
+        for key, group in candidates.groupby(keys, sort=False):
+            heap = heaps.setdefault(key, [])
+            for row in group.itertuples(index=False, name=None):
+                entry = (row[-1], -next(sequence), row)
+                if len(heap) < n:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+                else:
+                    break # The rest of the group has fewer views
+
+    rows = [entry[2] for key in sorted(heaps) for entry in sorted(heaps[key], reverse=True)]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def unique_qids(top_rows):
+    """
+    Returns the QIDs of the top rows without duplicates, in first-seen order.
+    """
+    return list(dict.fromkeys(top_rows['qid'].dropna()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract the top-N articles per month from a pageview dump.')
+    parser.add_argument('dump', help='Tab-separated dump without header (date, country, ..., qid, views).')
+    parser.add_argument('--top', type=int, default=400, help='Articles kept per month (or month and country).')
+    parser.add_argument('--per-country', action='store_true', help='Keep the top N per month and country.')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--rows-output', help='CSV for the top rows.')
+    parser.add_argument('--qids-output', default='2024_2023_wikiSpanish_qid.csv',
+                        help="CSV with a 'qid' column for the extractor.")
+    parser.add_argument('--fetch', metavar='JSONL', help='Also run process_qids_to_jsonl on the QIDs into this file.')
+    args = parser.parse_args()
+
+    top_rows = top_n_per_month(args.dump, args.top, args.per_country, args.chunksize)
+    qids = unique_qids(top_rows)
+    print(f"Kept {len(top_rows)} rows with {len(qids)} distinct QIDs.")
+
+    if args.rows_output:
+        top_rows.to_csv(args.rows_output, index=False)
+        print(f"Top rows written to '{args.rows_output}'.")
+    pd.DataFrame({'qid': qids}).to_csv(args.qids_output, index=False)
+    print(f"QIDs written to '{args.qids_output}'.")
+
+    if args.fetch:
+        from wikidata_loader import load_get_wikidata
+        load_get_wikidata().process_qids_to_jsonl(qids, args.fetch, workers=8, max_requests_per_second=10, resume=True)
@@ -0,0 +1,127 @@
+"""
+Pre-aggregated month x country x category cube of article views, built from
+figure1_labeled_data.csv, for the interactive drilldown in FP_app.py.
+
+The cube holds, for every (country, month, category), the sum of views and the number of
+articles. Rows are sorted by country and then month, so a country is one contiguous block
+and a month range inside it is found with two binary searches instead of a full scan.
+A national total ('All countries') block is stored the same way.
+
+Usage:
+    python views_cube.py figure1_labeled_data.csv --output figure2_cube.parquet
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ALL_COUNTRIES = 'All countries'
+CUBE_COLUMNS = ['country', 'month', 'category', 'views', 'articles']
+
+
+def build_cube(labeled_csv, chunksize=500_000):
+    """
+    Aggregates a labeled data CSV into the cube, reading it chunk by chunk.
+
+    Args:
+        labeled_csv (str): CSV with 'date' (YYYY-MM), 'country', 'views' and
+                           'categories_generated' columns (e.g. figure1_labeled_data.csv).
+        chunksize (int): Rows read per chunk.
+
+    Returns:
+        pd.DataFrame: The cube, sorted by country, month and category.
+    """
+    partials = []
+    for chunk in pd.read_csv(labeled_csv, usecols=['date', 'country', 'views', 'categories_generated'],
+                             chunksize=chunksize):
+        chunk['month'] = pd.to_datetime(chunk['date'].astype(str).str[:7], format='%Y-%m')
+        chunk['category'] = chunk['categories_generated'].astype(str).str.strip().str.lower()
+        partials.append(chunk.groupby(['country', 'month', 'category'], observed=True)
+                             .agg(views=('views', 'sum'), articles=('views', 'size')))
+
+    by_country = pd.concat(partials).groupby(level=[0, 1, 2]).sum().reset_index()
+    total = by_country.groupby(['month', 'category'], as_index=False)[['views', 'articles']].sum()
+    total.insert(0, 'country', ALL_COUNTRIES)
+
+    cube = pd.concat([by_country, total], ignore_index=True)[CUBE_COLUMNS]
+    cube['country'] = cube['country'].astype('category')
+    cube['category'] = cube['category'].astype('category')
+    cube['views'] = cube['views'].astype('int64')
+    cube['articles'] = cube['articles'].astype('int32')
+    return cube.sort_values(['country', 'month', 'category'], ignore_index=True)
+
+
+def save_cube(cube, path):
+    cube.to_parquet(path, index=False)
+
+
+def load_cube(path):
+    return pd.read_parquet(path)
+
+
+class ViewsCube:
+    """
+    Binary-search slicing over a cube built by build_cube.
+
+    Args:
+        cube (pd.DataFrame): The cube, sorted by country and month.
+    """
+
+    def __init__(self, cube):
+        self.cube = cube.reset_index(drop=True)
+        self._months = self.cube['month'].to_numpy(dtype='datetime64[ns]')
+
+        # Start/end row of every country's contiguous block
+        countries = self.cube['country'].astype(str).to_numpy()
+        boundaries = np.flatnonzero(countries[1:] != countries[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(countries)]])
+        self._blocks = {countries[start]: (start, end) for start, end in zip(starts, ends) if end > start}
+
+    @property
+    def countries(self):
+        """
+        Country names, with the national total first.
+        """
+        names = sorted(name for name in self._blocks if name != ALL_COUNTRIES)
+        return [ALL_COUNTRIES] + names if ALL_COUNTRIES in self._blocks else names
+
+    @property
+    def month_range(self):
+        """
+        Returns the (first, last) month in the cube as datetime.date objects.
+        """
+        return (pd.Timestamp(self._months.min()).date(), pd.Timestamp(self._months.max()).date())
+
+    def slice(self, country=ALL_COUNTRIES, start=None, end=None):
+        """
+        Returns the cube rows of one country whose month is within [start, end].
+
+        Args:
+            country (str): A country name, or ALL_COUNTRIES for the national total.
+            start (date): First month to include (None = from the beginning).
+            end (date): Last month to include (None = up to the end).
+
+        Returns:
+            pd.DataFrame: Columns month, category, views and articles.
+        """
+        if country not in self._blocks:
+            return self.cube.iloc[0:0][['month', 'category', 'views', 'articles']]
+
+        block_start, block_end = self._blocks[country]
+        months = self._months[block_start:block_end]
+        lo = 0 if start is None else np.searchsorted(months, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = len(months) if end is None else np.searchsorted(months, np.datetime64(pd.Timestamp(end)), side='right')
+        return self.cube.iloc[block_start + lo:block_start + hi][['month', 'category', 'views', 'articles']]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the month x country x category views cube.')
+    parser.add_argument('labeled_csv', nargs='?', default='figure1_labeled_data.csv')
+    parser.add_argument('--output', default='figure2_cube.parquet')
+    args = parser.parse_args()
+
+    cube = build_cube(args.labeled_csv)
+    save_cube(cube, args.output)
+    print(f"Wrote {len(cube)} cube rows for {cube['country'].nunique()} countries to '{args.output}'.")
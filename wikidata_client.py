@@ -0,0 +1,205 @@
+"""
+Shared HTTP client for the Wikidata API, used by the fetch functions in 4_get_wikidata.py.
+
+One requests.Session is reused for every call so connections are kept alive and pooled
+instead of opening a new TCP/TLS connection per request. Throttled (HTTP 429), failing
+(5xx) and lagged (maxlag) responses are retried with exponential backoff and jitter,
+honoring the server's Retry-After header.
+"""
+
+import multiprocessing
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add a User-Agent header as recommended by Wikidata API policies
+# https://www.wikidata.org/wiki/Wikidata:Contact_the_development_team#User-Agent
+DEFAULT_HEADERS = {
+    'User-Agent': 'Colab-Wikidata-Example/1.0 (https://colab.research.google.com; colab-user@example.com)'
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to cap the number of API requests per second
+    across all worker threads.
+
+    Args:
+        rate (float): Tokens added per second (the sustained request rate).
+        capacity (float): Maximum burst size (defaults to the rate, minimum 1).
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be a positive number of requests per second")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in shared memory, so one request budget can be
+    shared by several worker processes. Create it in the parent process and pass it
+    to the children as a Process argument.
+
+    Args:
+        rate (float): Tokens added per second (the total request rate of all processes).
+        capacity (float): Maximum burst size (defaults to the rate, minimum 1).
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be a positive number of requests per second")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._lock = multiprocessing.Lock()
+        self._tokens = multiprocessing.RawValue('d', self.capacity)
+        # time.time() rather than monotonic(), which is not comparable across processes everywhere
+        self._last_refill = multiprocessing.RawValue('d', time.time())
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                elapsed = max(0.0, now - self._last_refill.value)
+                self._tokens.value = min(self.capacity, self._tokens.value + elapsed * self.rate)
+                self._last_refill.value = now
+                if self._tokens.value >= 1:
+                    self._tokens.value -= 1
+                    return
+                wait = (1 - self._tokens.value) / self.rate
+            time.sleep(wait)
+
+
+class WikidataClient:
+    """
+    Pooled, retrying client for MediaWiki API GET requests.
+
+    Args:
+        max_retries (int): Retries after the first attempt before giving up.
+        backoff_base (float): First backoff delay in seconds; doubles on every retry.
+        backoff_max (float): Upper bound for a single backoff delay in seconds.
+        maxlag (int): Value of the 'maxlag' parameter sent with every request
+                      (None to leave it out). Wikidata asks bots to send maxlag=5.
+        pool_size (int): Number of keep-alive connections kept per host.
+        headers (dict): Headers sent with every request.
+    """
+
+    def __init__(self, max_retries=5, backoff_base=1.0, backoff_max=60.0, maxlag=5,
+                 pool_size=16, headers=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.maxlag = maxlag
+        self.rate_limiter = None # Optional TokenBucket shared by all callers
+        self.metrics = None # Optional PipelineMetrics (see pipeline_metrics.py)
+        self.request_count = 0
+        self.retry_count = 0
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """
+        Returns how long to wait before the next attempt: the server's Retry-After
+        if it sent one, otherwise exponential backoff with full jitter.
+        """
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass # Retry-After can also be an HTTP date; fall back to backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _count_retry(self, reason):
+        self.retry_count += 1
+        if self.metrics is not None:
+            self.metrics.count_retry(reason)
+
+    def get(self, endpoint, params, timeout=10):
+        """
+        Sends a GET request to the API and returns its decoded JSON body.
+
+        Args:
+            endpoint (str): The API URL (e.g., WIKIDATA_API_ENDPOINT).
+            params (dict): The query parameters.
+            timeout (float): Seconds to wait for the server on each attempt.
+
+        Returns:
+            dict: The decoded JSON response. If the server is still lagged after all
+                  retries, the response carrying the 'maxlag' error is returned.
+
+        Raises:
+            requests.exceptions.RequestException: When the request still fails after all retries.
+            json.JSONDecodeError: When the response body is not valid JSON.
+        """
+        params = dict(params)
+        if self.maxlag is not None:
+            params.setdefault('maxlag', self.maxlag)
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self.request_count += 1
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(endpoint, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                self._count_retry('connection')
+                continue
+
+            if self.metrics is not None:
+                self.metrics.observe_request(time.perf_counter() - start, len(response.content))
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, response.headers.get('Retry-After')))
+                attempt += 1
+                self._count_retry('throttled' if response.status_code == 429 else 'server_error')
+                continue
+
+            response.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx)
+            data = response.json()
+
+            # The API answers lagged requests with HTTP 200 and an error code of 'maxlag'
+            if data.get('error', {}).get('code') == 'maxlag' and attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, response.headers.get('Retry-After')))
+                attempt += 1
+                self._count_retry('maxlag')
+                continue
+
+            return data
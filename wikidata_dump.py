@@ -0,0 +1,195 @@
+"""
+Offline alternative to process_qids_to_jsonl: builds the same JSONL records from a local
+Wikidata JSON dump (latest-all.json.bz2 / .gz, one entity per line) instead of the API.
+
+The dump is read twice. The first pass keeps the requested QIDs, the second pass collects
+the labels of every property and value QID they reference, so no network calls are made.
+Lines are matched against the wanted id set by looking only at the id near the start of the
+line; only matching lines are JSON-decoded, and decoding is spread across a process pool.
+
+Usage:
+    python wikidata_dump.py latest-all.json.bz2 --qids-csv 2024_2023_wikiSpanish_qid.csv \\
+        --output entity_results.jsonl --processes 8
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import os
+from functools import partial
+from multiprocessing import Pool
+
+from wikidata_loader import load_get_wikidata
+
+ID_MARKER = b'"id":"'
+# The id is one of the first keys of every entity line, so only the head of a line is searched
+ID_SEARCH_WINDOW = 200
+LINES_PER_TASK = 500
+
+
+def open_dump(path):
+    """
+    Opens a (bz2- or gzip-compressed, or plain) JSON dump for binary line reading.
+    """
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def entity_id_of_line(line):
+    """
+    Returns the entity id of a dump line without decoding the JSON, or None.
+
+    Args:
+        line (bytes): One line of the dump.
+
+    Returns:
+        str: The id (e.g. 'Q42' or 'P31'), or None for the '[' / ']' lines.
+    """
+    start = line.find(ID_MARKER, 0, ID_SEARCH_WINDOW)
+    if start == -1:
+        return None
+    start += len(ID_MARKER)
+    end = line.find(b'"', start)
+    return line[start:end].decode('ascii', 'replace')
+
+
+def _decode_line(line):
+    return json.loads(line.rstrip().rstrip(b','))
+
+
+def iter_matching_lines(path, wanted_ids, batch_size=LINES_PER_TASK):
+    """
+    Streams the dump and yields batches of the raw lines whose entity id is in wanted_ids.
+
+    Args:
+        path (str): Path of the dump.
+        wanted_ids (set): Ids to keep.
+        batch_size (int): Number of lines per yielded batch.
+
+    Yields:
+        list[bytes]: Raw lines of wanted entities.
+    """
+    batch = []
+    with open_dump(path) as f:
+        for line in f:
+            if entity_id_of_line(line) in wanted_ids:
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def _parse_entity_batch(lines, lang='en'):
+    """
+    Process pool task for the first pass: decodes entity lines and keeps what the records need.
+    """
+    get_wikidata = load_get_wikidata()
+    parsed = []
+    for line in lines:
+        entity = _decode_line(line)
+        claims = entity.get('claims', {})
+        parsed.append({
+            'id': entity['id'],
+            'label': entity.get('labels', {}).get(lang, {}).get('value', 'No label found'),
+            'description': entity.get('descriptions', {}).get(lang, {}).get('value', 'No description found'),
+            'claims': claims,
+            'label_ids': sorted(set(claims) | get_wikidata.collect_value_qids(claims)),
+        })
+    return parsed
+
+
+def _parse_label_batch(lines, lang='en'):
+    """
+    Process pool task for the second pass: decodes entity lines and returns id -> label.
+    """
+    labels = {}
+    for line in lines:
+        entity = _decode_line(line)
+        label = entity.get('labels', {}).get(lang, {}).get('value')
+        if label:
+            labels[entity['id']] = label
+    return labels
+
+
+def process_dump_to_jsonl(dump_path, qid_list, output_filename="entity_data.jsonl", processes=None, lang='en'):
+    """
+    Builds the JSONL records of process_qids_to_jsonl for qid_list from a local dump.
+
+    The records have no category columns (is_sport, is_athlete, ...): those need the
+    subclass-of closure of class_hierarchy.py, which is fetched from the API. Add them
+    afterwards with process_qids_to_jsonl(class_hierarchy_path=...) if they are needed.
+
+    Args:
+        dump_path (str): Path of the Wikidata JSON dump (.json, .json.bz2 or .json.gz).
+        qid_list (list): A list of QID strings (duplicates are processed once).
+        output_filename (str): The name of the JSONL file to write results to.
+        processes (int): Size of the JSON parsing process pool (default: CPU count).
+        lang (str): The language code for labels and descriptions (default is 'en').
+    """
+    get_wikidata = load_get_wikidata()
+    qid_list = list(dict.fromkeys(qid_list))
+    wanted = set(qid_list)
+
+    print(f"Starting dump extraction for {len(qid_list)} QIDs from '{dump_path}'.")
+
+    with Pool(processes=processes) as pool:
+        # 1. First pass: the requested entities
+        entities = {}
+        for parsed_batch in pool.imap_unordered(partial(_parse_entity_batch, lang=lang), iter_matching_lines(dump_path, wanted)):
+            for entity in parsed_batch:
+                entities[entity['id']] = entity
+        print(f"  Pass 1: found {len(entities)} of {len(wanted)} entities.")
+
+        # 2. Second pass: labels for every property and value QID they reference
+        label_ids = set()
+        for entity in entities.values():
+            label_ids.update(entity['label_ids'])
+        labels = {}
+        for label_batch in pool.imap_unordered(partial(_parse_label_batch, lang=lang), iter_matching_lines(dump_path, label_ids)):
+            labels.update(label_batch)
+        print(f"  Pass 2: resolved {len(labels)} of {len(label_ids)} labels.")
+
+    successful_count = 0
+    failed_count = 0
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for qid in qid_list:
+            entity = entities.get(qid)
+            if entity is None:
+                record = {"QID": qid, "status": "failed", "error_message": f"Entity {qid} not found in dump."}
+                failed_count += 1
+            else:
+                property_labels = {pid: labels.get(pid, pid) for pid in entity['claims']}
+                record = {
+                    "QID": qid,
+                    "status": "success",
+                    "label": entity['label'],
+                    "description": entity['description'],
+                    "attributes": get_wikidata.extract_labeled_claim_values(entity['claims'], property_labels, labels),
+                }
+                successful_count += 1
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    print("\n--- Processing Complete ---")
+    print(f"Total Processed: {len(qid_list)}")
+    print(f"Successful Records: {successful_count}")
+    print(f"Failed Records: {failed_count}")
+    print("---------------------------\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract entity records from a local Wikidata JSON dump.')
+    parser.add_argument('dump', help='Path of latest-all.json(.bz2|.gz).')
+    parser.add_argument('--qids-csv', default='2024_2023_wikiSpanish_qid.csv', help="CSV with a 'qid' column.")
+    parser.add_argument('--output', default='entity_results.jsonl')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import pandas as pd
+    qids = pd.read_csv(args.qids_csv)['qid'].tolist()
+    process_dump_to_jsonl(args.dump, qids, args.output, processes=args.processes)
@@ -0,0 +1,25 @@
+"""
+Imports 4_get_wikidata.py as a regular module.
+
+The file name starts with a digit, so it cannot be imported with a plain import
+statement. Helper scripts (benchmarks, runners) load it through load_get_wikidata().
+"""
+
+import importlib.util
+import os
+import sys
+
+GET_WIKIDATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '4_get_wikidata.py')
+
+
+def load_get_wikidata():
+    """
+    Returns the 4_get_wikidata module, loading it once and registering it as 'get_wikidata'.
+    """
+    module = sys.modules.get('get_wikidata')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('get_wikidata', GET_WIKIDATA_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['get_wikidata'] = module
+        spec.loader.exec_module(module)
+    return module